@@ -0,0 +1,95 @@
+from bitboard import iter_bits
+from nodestore import NodeStore
+
+
+#------------------------
+# Optimal Searches
+#------------------------
+# Both searches share Board's move generator and the heuristic.Heuristic used by
+# bfsg(), and take the same arguments and return the same tuple as
+# bitboard.bfsg(). The push-distance matching never drops by more than one per
+# move, so it is consistent and both return solutions with the fewest moves.
+INF = float('inf')
+TABLE_SIZE = 1 << 20
+
+
+def astar(board, heuristic, frontier, explored, curr_player, curr_boxes):
+	"""A* on f = moves + heuristic. `explored` holds the expanded states; a
+	state may sit in the frontier more than once and is expanded only the first
+	time it is popped."""
+	player = board.index[curr_player]
+	boxes = board.encode(curr_boxes)
+	zobrist = board.zobrist
+	h = zobrist.hash(player, iter_bits(boxes))
+	node_repeated = 0
+	node_generated = 1
+	nodes = NodeStore()
+	frontier.push(heuristic(boxes), (player, boxes, h, 0, 0, nodes.add(-1)))
+	while frontier:
+		(now_player, now_boxes, h, g, push, node) = frontier.pop()
+		if not explored.add(h, now_player, now_boxes):
+			node_repeated += 1
+			continue
+		if board.is_win(now_boxes):
+			return node_generated, node_repeated, len(explored), nodes.path(node)
+		heuristic.parent = now_boxes
+		for m in board.available_moves(now_player, now_boxes):
+			res, is_pushed, new_player, new_boxes = board.move(now_player, now_boxes, m)
+			node_generated += 1
+			if not res:
+				continue
+			if is_pushed:
+				new_h = zobrist.move(h, now_player, new_player, board.neighbors[new_player][m])
+			else:
+				new_h = zobrist.move(h, now_player, new_player)
+			child = nodes.add(node, m, is_pushed)
+			frontier.push(g + 1 + heuristic(new_boxes), (new_player, new_boxes, new_h, g + 1, push + is_pushed, child), push + is_pushed)
+	return node_generated, node_repeated, len(explored), None
+
+
+def idastar(board, heuristic, frontier, explored, curr_player, curr_boxes, table_size=TABLE_SIZE):
+	"""Iterative deepening A*. Memory is the current path plus a transposition
+	table of at most `table_size` packed states with the fewest moves each was
+	reached in during this iteration; `frontier` and `explored` are unused."""
+	player = board.index[curr_player]
+	boxes = board.encode(curr_boxes)
+	node_repeated = 0
+	node_generated = 1
+	bound = heuristic(boxes)
+	while True:
+		table = {board.pack(player, boxes): 0}
+		path = []
+		stack = [(player, boxes, iter(board.available_moves(player, boxes)))]
+		next_bound = INF
+		while stack:
+			(now_player, now_boxes, moves) = stack[-1]
+			g = len(path)
+			heuristic.parent = now_boxes
+			for m in moves:
+				res, is_pushed, new_player, new_boxes = board.move(now_player, now_boxes, m)
+				node_generated += 1
+				if not res:
+					continue
+				key = board.pack(new_player, new_boxes)
+				seen = table.get(key)
+				if seen is not None and seen <= g + 1:
+					node_repeated += 1
+					continue
+				f = g + 1 + heuristic(new_boxes)
+				if f > bound:
+					next_bound = min(next_bound, f)
+					continue
+				if seen is not None or len(table) < table_size:
+					table[key] = g + 1
+				path.append((m, is_pushed))
+				if board.is_win(new_boxes):
+					return node_generated, node_repeated, len(table), path
+				stack.append((new_player, new_boxes, iter(board.available_moves(new_player, new_boxes))))
+				break
+			else:
+				stack.pop()
+				if path:
+					path.pop()
+		if next_bound == INF:
+			return node_generated, node_repeated, len(table), None
+		bound = next_bound
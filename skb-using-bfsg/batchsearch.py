@@ -0,0 +1,135 @@
+import numpy as np
+
+
+#------------------------
+# Batched Search
+#------------------------
+# Greedy best-first search on the bitboard engine's move-level states, run a
+# batch at a time on NumPy arrays. A state is a row [player, box cells sorted];
+# BATCH_SIZE of the best states are popped at once, all their children are made
+# as rows of one array, the ones seen before are removed with one set difference
+# on their Zobrist hashes, and the rest are scored with a single
+# Heuristic.evaluate_batch() call. The interpreter then works per batch and per
+# priority instead of per child; only the deadlock rules still run per push.
+#
+# States are told apart by their 64-bit Zobrist hash alone, like the explored
+# table without EXPLORED_EXACT, so the `explored` handed in goes unused. The
+# frontier holds one block of states per priority and batch; solver.solve()
+# wraps it in a frontier.BlockFrontier so its length and peak count states.
+BATCH_SIZE = 256
+SEED = 0
+
+
+def bfsg(board, heuristic, frontier, explored, curr_player, curr_boxes):
+	"""Same contract as bitboard.bfsg(): returns (node_generated, node_repeated,
+	explored, actions) with actions a list of (direction index, is_pushed), or
+	None when the level has no solution."""
+	neighbors = np.array(board.neighbors, dtype=np.intp).reshape(len(board.cells), 4)
+	dead = np.zeros(len(board.cells), dtype=bool)
+	goal = np.zeros(len(board.cells), dtype=bool)
+	for i in range(len(board.cells)):
+		dead[i] = bool(board.dead & board.bit[i])
+		goal[i] = bool(board.goals & board.bit[i])
+	rng = np.random.default_rng(SEED)
+	player_keys = rng.integers(0, 1 << 63, size=len(board.cells), dtype=np.int64)
+	box_keys = rng.integers(0, 1 << 63, size=len(board.cells), dtype=np.int64)
+	tie_pushes = getattr(frontier, "tie", "fifo") == "pushes"
+	# Rows waiting in the frontier take 2 bytes a cell whenever the cells fit
+	cell_type = np.int16 if len(board.cells) < 1 << 15 else np.int32
+
+	start = np.array([[board.index[curr_player]] + sorted(board.index[box] for box in curr_boxes)], dtype=cell_type)
+	seen = {int(hashes(start, player_keys, box_keys)[0])}
+	# Node i of the search tree: parents[i] and the move into it, as arrays per batch
+	parents = [np.array([-1])]
+	moves = [np.array([0])]
+	pushed = [np.array([0])]
+	size = 1
+	node_generated = 1
+	frontier.push(int(heuristic.evaluate_batch(start[:, 1:])[0]), (start, np.array([0]), np.array([0])))
+	while frontier:
+		blocks = []
+		count = 0
+		while frontier and count < BATCH_SIZE:
+			blocks.append(frontier.pop())
+			count += len(blocks[-1][0])
+		states = np.concatenate([block[0] for block in blocks])
+		nodes = np.concatenate([block[1] for block in blocks])
+		depths = np.concatenate([block[2] for block in blocks])
+
+		children, parent, direction, is_pushed, beyond = expand(states, neighbors)
+		node_generated += len(children)
+		alive = ~(is_pushed & dead[beyond])
+		children, parent, direction, is_pushed, beyond = (a[alive] for a in (children, parent, direction, is_pushed, beyond))
+
+		keys = hashes(children, player_keys, box_keys).tolist()
+		first = dict(zip(reversed(keys), range(len(keys) - 1, -1, -1)))
+		fresh = first.keys() - seen
+		seen |= fresh
+		keep = np.sort(np.fromiter((first[key] for key in fresh), dtype=np.intp, count=len(fresh)))
+		if board.deadlock is not None:
+			keep = keep[[not (push and board.deadlock.is_deadlock(mask(board, row[1:]), cell))
+						 for row, push, cell in zip(children[keep].tolist(), is_pushed[keep].tolist(), beyond[keep].tolist())]]
+		children, parent, direction, is_pushed = children[keep], parent[keep], direction[keep], is_pushed[keep]
+		if len(children) == 0:
+			continue
+
+		ids = np.arange(size, size + len(children))
+		size += len(children)
+		parents.append(nodes[parent])
+		moves.append(direction)
+		pushed.append(is_pushed.astype(np.intp))
+		# Every goal covered, as in Board.is_win(); there may be more boxes than goals
+		wins = np.flatnonzero(goal[children[:, 1:]].sum(axis=1) == goal.sum())
+		if len(wins):
+			node_repeated = node_generated - size
+			return node_generated, node_repeated, len(seen), path(parents, moves, pushed, ids[wins[0]])
+
+		values = heuristic.evaluate_batch(children[:, 1:])
+		depth = depths[parent] + is_pushed
+		groups = np.stack([values, depth]) if tie_pushes else values[np.newaxis]
+		order = np.lexsort(groups[::-1])
+		bounds = np.flatnonzero(np.any(np.diff(groups[:, order], axis=1), axis=0)) + 1
+		for block in np.split(order, bounds):
+			frontier.push(int(values[block[0]]), (children[block], ids[block], depth[block]), int(depth[block[0]]))
+	return node_generated, node_generated - size, len(seen), None
+
+def expand(states, neighbors):
+	"""Every legal move from every state, as one array operation per step over
+	states x directions: the child rows (boxes sorted again), the index of each
+	child's parent state, its direction, whether it pushed and the cell the
+	pushed box landed on."""
+	player = states[:, 0]
+	boxes = states[:, 1:, np.newaxis]
+	target = neighbors[player] # states x directions
+	beyond = neighbors[np.maximum(target, 0), np.arange(4)]
+	push = (boxes == target[:, np.newaxis]).any(axis=1)
+	blocked = push & ((beyond < 0) | (boxes == beyond[:, np.newaxis]).any(axis=1))
+	legal = np.flatnonzero((target >= 0) & ~blocked)
+	parent, direction = np.divmod(legal, 4)
+	target, beyond, push = target.ravel()[legal], beyond.ravel()[legal], push.ravel()[legal]
+	rows = states[parent]
+	rows[:, 0] = target
+	rows[:, 1:] = np.where(rows[:, 1:] == target[:, np.newaxis], beyond[:, np.newaxis], rows[:, 1:])
+	rows[:, 1:].sort(axis=1)
+	return rows, parent, direction, push, beyond
+
+def hashes(states, player_keys, box_keys):
+	return player_keys[states[:, 0]] ^ np.bitwise_xor.reduce(box_keys[states[:, 1:]], axis=1)
+
+def mask(board, boxes):
+	boxes_mask = 0
+	for cell in boxes:
+		boxes_mask |= board.bit[cell]
+	return boxes_mask
+
+def path(parents, moves, pushed, node):
+	"""Moves from the root to `node` as a list of (direction index, is_pushed)."""
+	parents = np.concatenate(parents).tolist()
+	moves = np.concatenate(moves).tolist()
+	pushed = np.concatenate(pushed).tolist()
+	actions = []
+	while parents[node] >= 0:
+		actions.append((moves[node], pushed[node]))
+		node = parents[node]
+	actions.reverse()
+	return actions
@@ -0,0 +1,185 @@
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+from contextlib import redirect_stdout
+from functools import partial
+from multiprocessing import Pool
+import solver
+import test_BFSG
+
+
+#------------------------
+# Benchmark Suite
+#------------------------
+# Solves every level WARMUP + RUNS times with the configuration in solver.py and
+# test_BFSG.py, and keeps every value with the median and interquartile range of
+# each metric. Every timed run is untraced and followed by a tracemalloc run for
+# the memory peak, so time is measured without the tracing overhead.
+#
+#   python benchmark.py --save before      store a named baseline
+#   python benchmark.py --compare before   diff against it, exit 1 on regression
+RUNS = 7
+WARMUP = 1
+BASELINES = "Baselines"
+# A change is flagged when the medians differ by more than THRESHOLD and a one
+# sided Mann-Whitney test on the values gives p < ALPHA. Runs of 3 or fewer can't
+# reach that; metrics that don't vary between runs (nodes, steps) are compared
+# directly.
+THRESHOLD = 0.05
+ALPHA = 0.01
+# Runs of one session vary less than sessions do, so a change must also clear
+# the noise floor: the interquartile ranges of the two runs must not overlap, and
+# the medians must differ by at least MIN_CHANGE (ns for time, bytes for memory)
+MIN_CHANGE = {"time": 5 * 10**5, "memory": 16 * 1024}
+METRICS = ("time", "nodes", "steps", "memory")
+
+
+def run_level(j, warmup=WARMUP, runs=RUNS):
+	"""Warmup and timed solves of level j+1 of solver.LEVELS in one worker. Returns (level,
+	{metric: [values]}) or (level, message) if a solve hit a limit."""
+	values = {metric: [] for metric in METRICS}
+	solver.SOLUTION_CACHE = False
+	with redirect_stdout(io.StringIO()):
+		for k in range(warmup + runs):
+			# test_BFSG times an untraced solve and traces a second one for the peak
+			test_BFSG.TRACE_MEMORY = k >= warmup
+			_, result = test_BFSG.solve_level(j)
+			if isinstance(result, str):
+				return j+1, result
+			metrics = result[0]
+			if not metrics.solved:
+				return j+1, "Solution not found"
+			if k < warmup:
+				continue
+			values["memory"].append(metrics.peak_bytes)
+			values["time"].append(metrics.search_ns)
+			values["nodes"].append(metrics.nodes)
+			values["steps"].append(metrics.steps)
+	return j+1, values
+
+def summary(values):
+	if len(values) > 1:
+		q1, _, q3 = statistics.quantiles(values, n=4, method='inclusive')
+	else:
+		q1 = q3 = values[0]
+	return {"median": statistics.median(values), "q1": q1, "q3": q3, "values": values}
+
+def run_suite(levels, warmup=WARMUP, runs=RUNS):
+	results = dict()
+	with Pool(test_BFSG.WORKERS, maxtasksperchild=1) as pool:
+		for level, values in pool.imap(partial(run_level, warmup=warmup, runs=runs), [level - 1 for level in levels]):
+			if isinstance(values, str):
+				results[str(level)] = {"error": values}
+			else:
+				results[str(level)] = {metric: summary(values[metric]) for metric in METRICS}
+			print("Level {} done".format(level))
+	return {
+		"config": {"levels": solver.LEVELS, "algorithm": test_BFSG.ALGORITHM, "engine": solver.ENGINE, "frontier": solver.FRONTIER,
+				   "tie_break": solver.TIE_BREAK, "explored": solver.EXPLORED, "deadlocks": list(solver.DEADLOCKS)},
+		"runs": runs,
+		"warmup": warmup,
+		"levels": results,
+	}
+
+
+#-----------------
+# Baselines
+#-----------------
+def baseline_path(name):
+	return os.path.join(BASELINES, "{}.json".format(name))
+
+def save_baseline(name, suite):
+	os.makedirs(BASELINES, exist_ok=True)
+	with open(baseline_path(name), 'w') as f:
+		json.dump(suite, f, indent=1)
+
+def load_baseline(name):
+	with open(baseline_path(name), 'r') as f:
+		return json.load(f)
+
+def verdict(old, new, metric):
+	"""-1 for a significant improvement, 1 for a regression, 0 otherwise. Lower
+	is better for every metric."""
+	if old["median"] == new["median"]:
+		return 0
+	change = (new["median"] - old["median"]) / old["median"] if old["median"] else 1
+	if abs(change) <= THRESHOLD:
+		return 0
+	direction = 1 if change > 0 else -1
+	if len(set(old["values"])) == 1 and len(set(new["values"])) == 1:
+		return direction
+	if abs(new["median"] - old["median"]) < MIN_CHANGE.get(metric, 0):
+		return 0
+	if (new["q1"] <= old["q3"]) if direction == 1 else (new["q3"] >= old["q1"]):
+		return 0
+	if direction == 1:
+		p = mann_whitney(new["values"], old["values"])
+	else:
+		p = mann_whitney(old["values"], new["values"])
+	return direction if p < ALPHA else 0
+
+def mann_whitney(larger, smaller):
+	"""Exact one sided p-value of the Mann-Whitney U test that `larger` tends to
+	be greater than `smaller` (ties count half)."""
+	n, m = len(larger), len(smaller)
+	u = sum((x > y) + 0.5 * (x == y) for x in larger for y in smaller)
+	# counts[k] = orderings of n + m distinct values giving U = k
+	counts = [[[1] + [0] * (n * m) for _ in range(m + 1)] for _ in range(n + 1)]
+	for i in range(1, n + 1):
+		for j in range(1, m + 1):
+			counts[i][j] = [counts[i][j - 1][k] + (counts[i - 1][j][k - j] if k >= j else 0) for k in range(n * m + 1)]
+	return sum(counts[n][m][k] for k in range(n * m + 1) if k >= u) / sum(counts[n][m])
+
+def compare(baseline, suite):
+	"""Prints the per-level diff and returns the number of regressions."""
+	regressions = 0
+	if baseline["config"] != suite["config"]:
+		print("Configuration differs from the baseline: {} -> {}\n".format(baseline["config"], suite["config"]))
+	for level, new in suite["levels"].items():
+		old = baseline["levels"].get(level)
+		if old is None:
+			continue
+		if "error" in new or "error" in old:
+			failed = "error" in new and "error" not in old
+			regressions += failed
+			print("Level {:>2}: {} -> {}{}".format(level, old.get("error", "solved"), new.get("error", "solved"),
+												   "  REGRESSION" if failed else ""))
+			continue
+		cells = []
+		for metric in METRICS:
+			flag = verdict(old[metric], new[metric], metric)
+			regressions += flag == 1
+			change = (new[metric]["median"] - old[metric]["median"]) / old[metric]["median"] if old[metric]["median"] else 0
+			cells.append("{} {:+.1%}{}".format(metric, change, {1: " REGRESSION", -1: " improved", 0: ""}[flag]))
+		print("Level {:>2}: {}".format(level, ", ".join(cells)))
+	return regressions
+
+def parse_levels(text):
+	levels = []
+	for part in text.split(","):
+		first, _, last = part.partition("-")
+		levels.extend(range(int(first), int(last or first) + 1))
+	return levels
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="Repeated benchmark of the solver configured in solver.py and test_BFSG.py")
+	parser.add_argument("--runs", type=int, default=RUNS)
+	parser.add_argument("--warmup", type=int, default=WARMUP)
+	parser.add_argument("--levels", help="e.g. 1-10,28, all levels of solver.LEVELS by default")
+	parser.add_argument("--save", metavar="NAME", help="store the results as a named baseline")
+	parser.add_argument("--compare", metavar="NAME", help="diff against a named baseline")
+	args = parser.parse_args()
+
+	levels = parse_levels(args.levels) if args.levels else range(1, len(solver.level_collection()) + 1)
+	suite = run_suite(levels, args.warmup, args.runs)
+	if args.save:
+		save_baseline(args.save, suite)
+		print("\nSaved baseline {}".format(baseline_path(args.save)))
+	if args.compare:
+		regressions = compare(load_baseline(args.compare), suite)
+		print("\n{} regression(s) against {}".format(regressions, args.compare))
+		sys.exit(1 if regressions else 0)
@@ -0,0 +1,144 @@
+from collections import deque
+from bitboard import iter_bits
+from heuristic import Heuristic, Cancelled
+from gridanalysis import UNREACHED
+from pushsearch import reachable, normalize, pushes, rebuild_solution
+
+
+#------------------------
+# Backward Pull Search
+#------------------------
+# Both directions work on push-level states (normalized player, boxes mask) as
+# in pushsearch.py, so a state reached from the start and from the solved
+# configuration is the same key and the two searches meet on it.
+
+def pulls(board, boxes, region):
+	"""Legal pulls (box cell, direction) from a player region: the player stands
+	next to the box, steps away from it in the opposite direction, and the box
+	follows onto the player's cell."""
+	neighbors = board.neighbors
+	bit = board.bit
+	for cell in iter_bits(region):
+		for d, target in enumerate(neighbors[cell]):
+			if target >= 0 and boxes & bit[target]:
+				behind = neighbors[cell][(d + 2) % 4]
+				if behind >= 0 and not boxes & bit[behind]:
+					yield target, d
+
+def goal_states(board):
+	"""One state per player region around the boxes sitting on the goals."""
+	states = []
+	free = ((1 << len(board.cells)) - 1) & ~board.goals
+	while free:
+		region = reachable(board, (free & -free).bit_length() - 1, board.goals)
+		states.append((normalize(region), board.goals))
+		free &= ~region
+	return states
+
+def push_distances(board, sources):
+	"""Pushes needed to move a box from each source point to every floor cell,
+	a sources x cells matrix shaped like gridanalysis.analyse()'s distances."""
+	distance = []
+	for source in sources:
+		steps = {board.index[source]: 0}
+		queue = deque([board.index[source]])
+		while queue:
+			cell = queue.popleft()
+			for d, target in enumerate(board.neighbors[cell]):
+				if target >= 0 and target not in steps and board.neighbors[cell][(d + 2) % 4] >= 0:
+					steps[target] = steps[cell] + 1
+					queue.append(target)
+		distance.append([steps.get(i, UNREACHED) for i in range(len(board.cells))])
+	return distance
+
+
+#-----------------
+# Search
+#-----------------
+def bfsg(board, heuristic, frontier, explored, curr_player, curr_boxes):
+	"""Greedy best-first search from the start alternating with a greedy pull
+	search from the solved configuration, until one reaches a state the other
+	has already seen.
+
+	Same arguments and return value as bitboard.bfsg(). Each direction keeps a
+	parent map that is also its explored set, since each must look states up in
+	the other's; `explored` is unused. The backward frontier is a new frontier of
+	the same kind, ordered on push distances back to the start boxes. A level
+	with more boxes than goals has no single solved configuration to pull back
+	from, so it is searched forward only.
+
+	Only `heuristic` is watched by a SearchMonitor, so its `cancelled` is checked
+	on every pop of either direction."""
+	player = board.index[curr_player]
+	boxes = board.encode(curr_boxes)
+	start = (normalize(reachable(board, player, boxes)), boxes)
+	backward_heuristic = Heuristic(push_distances(board, curr_boxes), board.cells, board)
+	backward_frontier = type(frontier)(frontier.tie)
+	node_repeated = 0
+	node_generated = 1
+	# parent[key] = (parent key, box cell, direction) of the push from the parent
+	forward = {start: None}
+	frontier.push(heuristic(boxes), start)
+	# parent[key] = (parent key, box cell, direction) of the push back to the parent
+	backward = dict()
+	forward_only = bin(boxes).count("1") != bin(board.goals).count("1")
+	for key in ([] if forward_only else goal_states(board)):
+		backward[key] = None
+		backward_frontier.push(backward_heuristic(key[1]), key)
+		node_generated += 1
+	meet = start if start in backward or (forward_only and board.is_win(boxes)) else None
+
+	while meet is None and (frontier or backward_frontier):
+		if heuristic.cancelled:
+			raise Cancelled
+		if frontier:
+			now_key = frontier.pop()
+			(now_player, now_boxes) = now_key
+			heuristic.parent = now_boxes
+			for box, d in pushes(board, now_boxes, reachable(board, now_player, now_boxes)):
+				beyond = board.neighbors[box][d]
+				new_boxes = now_boxes ^ (board.bit[box] | board.bit[beyond])
+				node_generated += 1
+				if board.deadlock is not None and board.deadlock.is_deadlock(new_boxes, beyond):
+					continue
+				key = (normalize(reachable(board, box, new_boxes)), new_boxes)
+				if key in forward:
+					node_repeated += 1
+					continue
+				forward[key] = (now_key, box, d)
+				if key in backward or (forward_only and board.is_win(new_boxes)):
+					meet = key
+					break
+				frontier.push(heuristic(new_boxes), key)
+		if meet is None and backward_frontier:
+			now_key = backward_frontier.pop()
+			(now_player, now_boxes) = now_key
+			backward_heuristic.parent = now_boxes
+			for box, d in pulls(board, now_boxes, reachable(board, now_player, now_boxes)):
+				cell = board.neighbors[box][(d + 2) % 4]
+				new_boxes = now_boxes ^ (board.bit[box] | board.bit[cell])
+				node_generated += 1
+				key = (normalize(reachable(board, board.neighbors[cell][(d + 2) % 4], new_boxes)), new_boxes)
+				if key in backward:
+					node_repeated += 1
+					continue
+				# Seen from the new state this is a push of the box on `cell` towards `box`
+				backward[key] = (now_key, cell, d)
+				if key in forward:
+					meet = key
+					break
+				backward_frontier.push(backward_heuristic(new_boxes), key)
+
+	if meet is None:
+		return node_generated, node_repeated, len(forward) + len(backward), None
+	chain = []
+	key = meet
+	while forward[key] is not None:
+		key, box, d = forward[key]
+		chain.append((box, d))
+	chain.reverse()
+	key = meet
+	while backward.get(key) is not None:
+		key, box, d = backward[key]
+		chain.append((box, d))
+	return node_generated, node_repeated, len(forward) + len(backward), rebuild_solution(board, chain, player, boxes)
@@ -0,0 +1,136 @@
+from zobrist import ZobristTable
+from nodestore import NodeStore
+
+
+#------------------------
+# Bitboard State Engine
+#------------------------
+# Directions are kept in the same clock-wise order as `directions` in solver.py
+# so a direction index can be mapped back with directions[d].
+VECTORS = [(0, -1), (-1, 0), (0, 1), (1, 0)] # U, L, D, R
+CHARS = ['U', 'L', 'D', 'R']
+
+
+class Board:
+	"""Numbers the floor cells of a level once and stores boxes, goals and dead
+	squares as integer bitmasks. Walls never get a number: a move into one is
+	simply a -1 in the neighbor table. A state is a pair (player cell, boxes mask)."""
+
+	def __init__(self, goals, paths, dead_squares=()):
+		self.cells = sorted(paths, key=lambda point: (point[1], point[0]))
+		self.index = {point: i for i, point in enumerate(self.cells)}
+		self.bit = [1 << i for i in range(len(self.cells))]
+		# neighbors[cell][d] is the adjacent floor cell in direction d, -1 if blocked
+		self.neighbors = []
+		for (x, y) in self.cells:
+			self.neighbors.append(tuple(self.index.get((x + dx, y + dy), -1) for dx, dy in VECTORS))
+		self.goals = self.encode(goals)
+		self.dead = self.encode(dead_squares)
+		self.zobrist = ZobristTable(range(len(self.cells)))
+		# Optional deadlock.DeadlockDetector consulted on every push
+		self.deadlock = None
+		# A packed state is boxes << player_bits | player, state_bits wide
+		self.player_bits = max(1, (len(self.cells) - 1).bit_length())
+		self.state_bits = len(self.cells) + self.player_bits
+
+	def encode(self, points):
+		mask = 0
+		for point in points:
+			mask |= self.bit[self.index[point]]
+		return mask
+
+	def decode(self, mask):
+		return tuple(self.cells[i] for i in iter_bits(mask))
+
+	def pack(self, player, boxes):
+		return boxes << self.player_bits | player
+
+	def pack_points(self, player, boxes):
+		return self.encode(boxes) << self.player_bits | self.index[player]
+
+	def available_moves(self, player, boxes):
+		available_moves = []
+		for d, target in enumerate(self.neighbors[player]):
+			if target < 0:
+				continue
+			if boxes & self.bit[target]:
+				beyond = self.neighbors[target][d]
+				if beyond < 0 or boxes & self.bit[beyond]:
+					continue
+			available_moves.append(d)
+		return available_moves
+
+	def move(self, player, boxes, d):
+		"""Same contract as solver.Puzzle.move(): returns (res, is_pushed, player, boxes)."""
+		target = self.neighbors[player][d]
+		if boxes & self.bit[target]:
+			beyond = self.neighbors[target][d]
+			boxes ^= self.bit[target] | self.bit[beyond]
+			res = not (self.dead & self.bit[beyond])
+			if res and self.deadlock is not None:
+				res = not self.deadlock.is_deadlock(boxes, beyond)
+			return res, 1, target, boxes
+		return True, 0, target, boxes
+
+	def is_win(self, boxes):
+		return boxes & self.goals == self.goals
+
+
+def iter_bits(mask):
+	while mask:
+		low = mask & -mask
+		yield low.bit_length() - 1
+		mask ^= low
+
+
+#-----------------
+# Search
+#-----------------
+def bfsg(board, heuristic, frontier, explored, curr_player, curr_boxes, checkpoint=None, budget=None):
+	"""Greedy best-first search on bitboard states. `heuristic` is a
+	heuristic.Heuristic built for the board, `frontier` an empty frontier from
+	frontier.make_frontier() and `explored` an empty explored.make_explored().
+
+	Takes the player as a point and boxes as a tuple of points, like
+	solver.tuple_bfsg(), and returns (node_generated, node_repeated, explored, actions) where
+	actions is a list of (direction index, is_pushed), or None as actions when
+	the level has no solution.
+
+	With a checkpoint.Checkpoint the search is snapshotted as it goes; when the
+	checkpoint was loaded, `frontier` and `explored` are the restored ones and
+	the search carries on from there. A budget.MemoryBudget bounds the memory
+	the search takes."""
+	zobrist = board.zobrist
+	if checkpoint is not None and checkpoint.search is not None:
+		node_generated, node_repeated, nodes = checkpoint.search
+	else:
+		player = board.index[curr_player]
+		boxes = board.encode(curr_boxes)
+		h = zobrist.hash(player, iter_bits(boxes))
+		node_repeated = 0
+		node_generated = 1
+		explored.add(h, player, boxes)
+		nodes = NodeStore()
+		frontier.push(heuristic(boxes), (player, boxes, h, 0, nodes.add(-1)))
+	while frontier:
+		if checkpoint is not None and checkpoint.due():
+			checkpoint.save(frontier, explored, (node_generated, node_repeated, nodes))
+		if budget is not None:
+			budget.enforce(frontier, explored, nodes)
+		(now_player, now_boxes, h, push, node) = frontier.pop()
+		heuristic.parent = now_boxes
+		for m in board.available_moves(now_player, now_boxes):
+			res, is_pushed, new_player, new_boxes = board.move(now_player, now_boxes, m)
+			if is_pushed:
+				new_h = zobrist.move(h, now_player, new_player, board.neighbors[new_player][m])
+			else:
+				new_h = zobrist.move(h, now_player, new_player)
+			if res and explored.add(new_h, new_player, new_boxes):
+				child = nodes.add(node, m, is_pushed)
+				if board.is_win(new_boxes):
+					return node_generated + 1, node_repeated, len(explored), nodes.path(child)
+				frontier.push(heuristic(new_boxes), (new_player, new_boxes, new_h, push + is_pushed, child), push + is_pushed)
+			else:
+				node_repeated += 1
+			node_generated += 1
+	return node_generated, node_repeated, len(explored), None
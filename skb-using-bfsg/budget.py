@@ -0,0 +1,53 @@
+import math
+
+
+#------------------------
+# Memory Budget
+#------------------------
+# Keeps a search's frontier, explored states, search tree and heuristic cache
+# under `max_bytes`, as their nbytes() estimates count them. Whenever they are
+# over it, the heuristic cache, which only saves time, is shrunk first. If that
+# isn't enough the worst frontier entries are dropped until the frontier takes
+# PRUNE_TO of the room the rest leaves it, like SMA* forgets its worst leaves
+# (without backing their values up into the parents). Dropped states stay
+# explored, so they are never generated again: a search that had to drop
+# entries can miss the solution and end with None, and `dropped` tells it apart
+# from a level without one. When the explored states and the tree alone fill the
+# budget, BudgetExceeded is raised instead.
+PRUNE_TO = 0.75
+# Pops between two measurements
+CHECK_EVERY = 256
+
+
+class BudgetExceeded(MemoryError):
+	"""Raised when a search can't be kept within its memory budget."""
+
+
+class MemoryBudget:
+
+	def __init__(self, max_bytes, heuristic):
+		self.max_bytes = max_bytes
+		self.heuristic = heuristic
+		self.pops = 0
+		self.dropped = 0 # frontier entries dropped so far
+
+	def enforce(self, frontier, explored, nodes):
+		"""Called by the engine once per pop, before the pop."""
+		self.pops += 1
+		if self.pops % CHECK_EVERY:
+			return
+		kept = explored.nbytes() + nodes.nbytes()
+		cache = self.heuristic.nbytes()
+		used = frontier.nbytes()
+		if kept + cache + used <= self.max_bytes:
+			return
+		if cache:
+			excess = kept + cache + used - self.max_bytes * PRUNE_TO
+			self.heuristic.shrink(int(len(self.heuristic.cache) * max(0, 1 - excess / cache)))
+			cache = self.heuristic.nbytes()
+		if kept + cache >= self.max_bytes:
+			raise BudgetExceeded("Explored states and search tree take {} bytes, the budget is {}".format(kept, self.max_bytes))
+		if kept + cache + used <= self.max_bytes:
+			return
+		excess = used - (self.max_bytes - kept - cache) * PRUNE_TO
+		self.dropped += frontier.prune(math.ceil(excess * len(frontier) / used))
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import pickle
+import time
+
+
+#------------------------
+# Search Checkpoints
+#------------------------
+# A running search is snapshotted to one file per level, start and search
+# configuration in CHECKPOINT_DIR: its frontier, its explored states and the
+# counters and search tree the engine keeps. A search started again on the same
+# key picks up from the snapshot and carries on exactly as the first run would
+# have. The file is removed once the search ends.
+#
+# Snapshots are pickled to a temporary file next to the final one, synced and
+# renamed over it, so a crash while writing leaves the previous snapshot
+# whole. The next snapshot is due `interval` seconds after the last one, or
+# later when writing takes more than MAX_IO_SHARE of the search time.
+CHECKPOINT_DIR = os.path.join("Cache", "checkpoints")
+VERSION = 1 # snapshots of other versions are ignored
+MAX_IO_SHARE = 0.05
+# Pops between two looks at the clock
+CHECK_EVERY = 1024
+
+
+class Checkpoint:
+
+	def __init__(self, key, interval=60, directory=CHECKPOINT_DIR):
+		self.path = os.path.join(directory, hashlib.sha1(key.encode()).hexdigest() + ".ckpt")
+		self.interval = interval
+		self.pops = 0
+		self.due_at = time.monotonic() + interval
+		self.saved = 0
+		self.write_s = 0.0
+		self.search = None # the engine's counters and tree, once load() found a snapshot
+
+	def load(self):
+		"""The (frontier, explored, search) of the last snapshot, or None. The
+		explored part is what the explored container's snapshot() returned."""
+		if not os.path.exists(self.path):
+			return None
+		try:
+			with open(self.path, 'rb') as f:
+				version, frontier, explored, search = pickle.load(f)
+		except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+			return None
+		if version != VERSION:
+			return None
+		self.search = search
+		return frontier, explored, search
+
+	def due(self):
+		"""Called by the engine once per pop, before the pop."""
+		self.pops += 1
+		if self.pops % CHECK_EVERY:
+			return False
+		return time.monotonic() >= self.due_at
+
+	def save(self, frontier, explored, search):
+		start = time.monotonic()
+		os.makedirs(os.path.dirname(self.path), exist_ok=True)
+		temp = "{}.{}.tmp".format(self.path, os.getpid())
+		with open(temp, 'wb') as f:
+			pickle.dump((VERSION, frontier, explored.snapshot(), search), f, protocol=pickle.HIGHEST_PROTOCOL)
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(temp, self.path)
+		now = time.monotonic()
+		self.saved += 1
+		self.write_s += now - start
+		self.due_at = now + max(self.interval, (now - start) / MAX_IO_SHARE)
+
+	def clear(self):
+		if os.path.exists(self.path):
+			os.remove(self.path)
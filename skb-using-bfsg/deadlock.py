@@ -0,0 +1,120 @@
+from bitboard import iter_bits
+
+
+#------------------------
+# Dynamic Deadlocks
+#------------------------
+# Checked after every push, looking only at the neighborhood of the pushed box:
+#   "line"   - a wall segment closed at both ends holds more boxes than goals
+#   "block"  - the box completes a 2x2 square of boxes/walls with a box off goal
+#   "freeze" - the box can be pushed along neither axis and is not on a goal
+RULES = ("line", "block", "freeze")
+
+
+class DeadlockDetector:
+	"""Works on bitboard.Board states. `pruned` counts the children each rule
+	rejected."""
+
+	def __init__(self, board, rules=RULES):
+		for rule in rules:
+			if rule not in RULES:
+				raise ValueError("Unknown deadlock rule: {}".format(rule))
+		self.board = board
+		self.rules = [rule for rule in RULES if rule in rules]
+		self.pruned = {rule: 0 for rule in self.rules}
+		self.lines = [[] for _ in board.cells]
+		self.squares = [[] for _ in board.cells]
+		self.set_lines()
+		self.set_squares()
+
+	def set_lines(self):
+		"""Masks of the wall segments, closed by walls at both ends, that a box
+		can only slide along."""
+		board = self.board
+		neighbors = board.neighbors
+		for side in range(4):
+			axis = (side + 1) % 4
+			back = (side + 3) % 4
+			for start, nbs in enumerate(neighbors):
+				# A segment starts at a cell against the wall whose back is walled too
+				if nbs[side] >= 0 or nbs[back] >= 0:
+					continue
+				line = 0
+				cell = start
+				while cell >= 0 and neighbors[cell][side] < 0:
+					line |= board.bit[cell]
+					cell = neighbors[cell][axis]
+				if cell < 0:
+					for i in iter_bits(line):
+						self.lines[i].append((line, popcount(line & board.goals)))
+
+	def set_squares(self):
+		"""For every cell, the other three cells of each 2x2 square it is in
+		(-1 for a wall or anything off the floor)."""
+		board = self.board
+		for i, (x, y) in enumerate(board.cells):
+			for dx in (-1, 1):
+				for dy in (-1, 1):
+					self.squares[i].append(tuple(board.index.get(point, -1) for point in ((x + dx, y), (x, y + dy), (x + dx, y + dy))))
+
+	def is_deadlock(self, boxes, box):
+		"""`boxes` is the mask after pushing a box onto cell `box`."""
+		for rule in self.rules:
+			if getattr(self, rule)(boxes, box):
+				self.pruned[rule] += 1
+				return True
+		return False
+
+	def is_deadlock_points(self, boxes, box):
+		return self.is_deadlock(self.board.encode(boxes), self.board.index[box])
+
+	def line(self, boxes, box):
+		for line, goals in self.lines[box]:
+			if popcount(boxes & line) > goals:
+				return True
+		return False
+
+	def block(self, boxes, box):
+		bit = self.board.bit
+		goals = self.board.goals
+		for square in self.squares[box]:
+			off_goal = not goals & bit[box]
+			for cell in square:
+				if cell >= 0:
+					if not boxes & bit[cell]:
+						break
+					if not goals & bit[cell]:
+						off_goal = True
+			else:
+				if off_goal:
+					return True
+		return False
+
+	def freeze(self, boxes, box):
+		return not self.board.goals & self.board.bit[box] and self.is_frozen(box, boxes, 0)
+
+	def is_frozen(self, cell, boxes, seen):
+		# Boxes already on the current chain count as walls, which breaks cycles
+		seen |= self.board.bit[cell]
+		return self.is_blocked(cell, boxes, seen, 0) and self.is_blocked(cell, boxes, seen, 1)
+
+	def is_blocked(self, cell, boxes, seen, axis):
+		"""Whether the box on `cell` can't move along `axis` (0 vertical, 1 horizontal)."""
+		board = self.board
+		bit = board.bit
+		first = board.neighbors[cell][axis]
+		second = board.neighbors[cell][axis + 2]
+		if first < 0 or second < 0:
+			return True
+		if (seen & bit[first]) or (seen & bit[second]):
+			return True
+		if (board.dead & bit[first]) and (board.dead & bit[second]):
+			return True
+		for side in (first, second):
+			if boxes & bit[side] and self.is_frozen(side, boxes, seen):
+				return True
+		return False
+
+
+def popcount(mask):
+	return bin(mask).count('1')
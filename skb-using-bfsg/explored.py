@@ -0,0 +1,137 @@
+import sys
+from array import array
+from zobrist import StateKey
+
+
+#------------------------
+# Explored States
+#------------------------
+# Both explored containers have add(h, player, boxes) -> True if the state is
+# new, len() and nbytes(). `h` is the state's Zobrist hash. snapshot() gives
+# the contents as plain data for checkpoint.py, restore() puts them back.
+MASK64 = (1 << 64) - 1
+MAX_BYTES = 1 << 30
+
+
+class ExploredSet:
+	"""Python set of StateKey objects, the original explored set."""
+
+	def __init__(self):
+		self.states = set()
+
+	def __len__(self):
+		return len(self.states)
+
+	def add(self, h, player, boxes):
+		key = StateKey(player, boxes, h)
+		if key in self.states:
+			return False
+		self.states.add(key)
+		return True
+
+	def nbytes(self):
+		# The set and its keys, with the player and boxes of one key for all of them
+		if not self.states:
+			return sys.getsizeof(self.states)
+		key = next(iter(self.states))
+		return sys.getsizeof(self.states) + len(self.states) * (sys.getsizeof(key) + sys.getsizeof(key.player) + sys.getsizeof(key.boxes))
+
+	def snapshot(self):
+		return [(key.player, key.boxes, key.hash) for key in self.states]
+
+	def restore(self, snapshot):
+		self.states = {StateKey(player, boxes, h) for player, boxes, h in snapshot}
+
+
+class ExploredTable:
+	"""Open-addressing hash table over flat 64-bit `array` storage.
+
+	Each slot holds the state's Zobrist hash (0 marks an empty slot). Without
+	`pack` two states are the same when their 64-bit hashes are equal; with
+	`pack(player, boxes) -> int` the packed state is stored next to the hash in
+	`state_bits` wide slots and compared on every hash match. The table doubles
+	whenever it gets half full and raises MemoryError instead of growing past
+	`max_bytes`."""
+
+	def __init__(self, pack=None, state_bits=0, max_bytes=MAX_BYTES, capacity=1 << 12):
+		self.pack = pack
+		self.words = (state_bits + 63) // 64 if pack is not None else 0
+		self.max_bytes = max_bytes
+		self.size = 0
+		self.hashes, self.states = self.allocate(capacity)
+		self.mask = capacity - 1
+
+	def __len__(self):
+		return self.size
+
+	def allocate(self, capacity):
+		nbytes = 8 * capacity * (1 + self.words)
+		if nbytes > self.max_bytes:
+			raise MemoryError("Explored table needs {} bytes, the ceiling is {}".format(nbytes, self.max_bytes))
+		return array('Q', bytes(8 * capacity)), array('Q', bytes(8 * capacity * self.words))
+
+	def add(self, h, player, boxes):
+		h = (h & MASK64) or 1
+		words = self.words
+		state = self.pack(player, boxes) if words else 0
+		hashes = self.hashes
+		mask = self.mask
+		i = h & mask
+		while hashes[i]:
+			if hashes[i] == h and (not words or self.state_at(i) == state):
+				return False
+			i = (i + 1) & mask
+		if 2 * (self.size + 1) > len(hashes):
+			self.grow()
+			return self.add(h, player, boxes)
+		hashes[i] = h
+		if words:
+			self.store(i, state)
+		self.size += 1
+		return True
+
+	def state_at(self, i):
+		states = self.states
+		base = i * self.words
+		state = 0
+		for k in range(self.words):
+			state |= states[base + k] << (64 * k)
+		return state
+
+	def store(self, i, state):
+		base = i * self.words
+		for k in range(self.words):
+			self.states[base + k] = (state >> (64 * k)) & MASK64
+
+	def grow(self):
+		old_hashes, old_states = self.hashes, self.states
+		words = self.words
+		self.hashes, self.states = self.allocate(2 * len(old_hashes))
+		self.mask = len(self.hashes) - 1
+		for j, h in enumerate(old_hashes):
+			if h:
+				i = h & self.mask
+				while self.hashes[i]:
+					i = (i + 1) & self.mask
+				self.hashes[i] = h
+				self.states[i * words:(i + 1) * words] = old_states[j * words:(j + 1) * words]
+
+	def snapshot(self):
+		# Without `pack`, which is the board's method and comes with the new table
+		return self.size, self.hashes, self.states
+
+	def restore(self, snapshot):
+		self.size, self.hashes, self.states = snapshot
+		self.mask = len(self.hashes) - 1
+
+	def nbytes(self):
+		return self.hashes.itemsize * len(self.hashes) + self.states.itemsize * len(self.states)
+
+
+def make_explored(kind="set", pack=None, state_bits=0, max_bytes=MAX_BYTES):
+	"""`pack`/`state_bits` turn on exact verification for the table."""
+	if kind == "set":
+		return ExploredSet()
+	if kind == "table":
+		return ExploredTable(pack, state_bits, max_bytes)
+	raise ValueError("Unknown explored set: {}".format(kind))
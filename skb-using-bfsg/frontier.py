@@ -0,0 +1,180 @@
+import heapq
+import sys
+from collections import deque
+
+
+#------------------------
+# Frontiers
+#------------------------
+# Every frontier has push(priority, item, pushes=0), pop(), len() and `peak`, the
+# largest len() it has reached, plus prune(count), which drops the `count`
+# entries that would be popped last, and nbytes(), an estimate. Priorities
+# are small ints (heuristic values) and ties are broken explicitly:
+#   "fifo"   - oldest first, the order SortedList gave equal keys
+#   "lifo"   - newest first, dives deeper along the current line
+#   "pushes" - fewest box pushes first, oldest first among those
+TIE_BREAKS = ("fifo", "lifo", "pushes")
+
+
+class BucketQueue:
+	"""One bucket per priority value plus a heap of the priorities that have a
+	bucket, so a push or pop touches the heap only when a bucket is created or
+	emptied."""
+
+	def __init__(self, tie="fifo"):
+		if tie not in TIE_BREAKS:
+			raise ValueError("Unknown tie break: {}".format(tie))
+		self.tie = tie
+		self.buckets = dict()
+		self.priorities = []
+		self.size = 0
+		self.peak = 0
+		self.counter = 0
+
+	def __len__(self):
+		return self.size
+
+	def push(self, priority, item, pushes=0):
+		bucket = self.buckets.get(priority)
+		if bucket is None:
+			bucket = [] if self.tie == "pushes" else deque()
+			self.buckets[priority] = bucket
+			heapq.heappush(self.priorities, priority)
+		if self.tie == "pushes":
+			heapq.heappush(bucket, (pushes, self.counter, item))
+			self.counter += 1
+		else:
+			bucket.append(item)
+		self.size += 1
+		if self.size > self.peak:
+			self.peak = self.size
+
+	def pop(self):
+		priority = self.priorities[0]
+		bucket = self.buckets[priority]
+		if self.tie == "fifo":
+			item = bucket.popleft()
+		elif self.tie == "lifo":
+			item = bucket.pop()
+		else:
+			item = heapq.heappop(bucket)[2]
+		if not bucket:
+			del self.buckets[priority]
+			heapq.heappop(self.priorities)
+		self.size -= 1
+		return item
+
+	def prune(self, count):
+		"""Drops up to `count` entries, worst priority first, and always keeps
+		the best one. Returns the number dropped."""
+		count = min(count, self.size - 1)
+		dropped = 0
+		for priority in sorted(self.priorities, reverse=True):
+			if dropped >= count:
+				break
+			bucket = self.buckets[priority]
+			n = min(count - dropped, len(bucket))
+			if self.tie == "fifo":
+				for _ in range(n):
+					bucket.pop()
+			elif self.tie == "lifo":
+				for _ in range(n):
+					bucket.popleft()
+			else:
+				bucket[:] = heapq.nsmallest(len(bucket) - n, bucket)
+			dropped += n
+			if not bucket:
+				del self.buckets[priority]
+		self.priorities = list(self.buckets)
+		heapq.heapify(self.priorities)
+		self.size -= dropped
+		return dropped
+
+	def nbytes(self):
+		if not self.size:
+			return 0
+		item = next(iter(self.buckets.values()))[0]
+		if self.tie == "pushes":
+			item = item[2]
+		return self.size * (entry_bytes(item) + 8)
+
+
+class HeapFrontier:
+	"""Binary heap of (priority, tie key, item)."""
+
+	def __init__(self, tie="fifo"):
+		if tie not in TIE_BREAKS:
+			raise ValueError("Unknown tie break: {}".format(tie))
+		self.tie = tie
+		self.heap = []
+		self.peak = 0
+		self.counter = 0
+
+	def __len__(self):
+		return len(self.heap)
+
+	def push(self, priority, item, pushes=0):
+		self.counter += 1
+		if self.tie == "fifo":
+			key = self.counter
+		elif self.tie == "lifo":
+			key = -self.counter
+		else:
+			key = (pushes, self.counter)
+		heapq.heappush(self.heap, (priority, key, item))
+		if len(self.heap) > self.peak:
+			self.peak = len(self.heap)
+
+	def pop(self):
+		return heapq.heappop(self.heap)[2]
+
+	def prune(self, count):
+		count = min(count, len(self.heap) - 1)
+		if count <= 0:
+			return 0
+		self.heap = heapq.nsmallest(len(self.heap) - count, self.heap)
+		return count
+
+	def nbytes(self):
+		if not self.heap:
+			return 0
+		return len(self.heap) * (entry_bytes(self.heap[0][2]) + sys.getsizeof((0, 0, None)) + 8)
+
+
+def entry_bytes(item):
+	"""Size of a frontier item and the objects it holds directly."""
+	return sys.getsizeof(item) + sum(sys.getsizeof(field) for field in item)
+
+
+class BlockFrontier:
+	"""Wraps a frontier whose items are blocks of states, as batchsearch.bfsg()
+	pushes them, so len() and `peak` count the states and not the blocks. The
+	first element of a block holds its states."""
+
+	def __init__(self, frontier):
+		self.frontier = frontier
+		self.tie = frontier.tie
+		self.size = 0
+		self.peak = 0
+
+	def __len__(self):
+		return self.size
+
+	def push(self, priority, block, pushes=0):
+		self.frontier.push(priority, block, pushes)
+		self.size += len(block[0])
+		if self.size > self.peak:
+			self.peak = self.size
+
+	def pop(self):
+		block = self.frontier.pop()
+		self.size -= len(block[0])
+		return block
+
+
+FRONTIERS = {"bucket": BucketQueue, "heap": HeapFrontier}
+
+def make_frontier(kind="bucket", tie="fifo"):
+	if kind not in FRONTIERS:
+		raise ValueError("Unknown frontier: {}".format(kind))
+	return FRONTIERS[kind](tie)
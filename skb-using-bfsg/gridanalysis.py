@@ -0,0 +1,54 @@
+import numpy as np
+from bitboard import VECTORS
+
+
+#------------------------
+# Grid Analysis
+#------------------------
+# Static analysis of a level on NumPy arrays. The level becomes boolean wall and
+# floor grids, and the push distances to every goal come out of one breadth-first
+# pass over all goals at once: each step shifts a goals x height x width frontier
+# in the four directions and keeps the cells a box can be pulled to.
+UNREACHED = -1
+# Cells of padding around the grid, so shifted arrays never wrap into the level
+# and cells just outside it read as not walls
+MARGIN = 2
+
+
+def analyse(walls, goals, cells):
+	"""Returns (distance, dead) for the floor `cells`, in bitboard.Board order:
+	distance is an int16 goals x cells matrix of the pushes from each cell to
+	each goal (goals sorted), UNREACHED where a box can't get there, and dead a
+	bool mask of the cells no goal is reachable from."""
+	goals = sorted(goals)
+	points = np.array(list(walls) + cells, dtype=np.intp).reshape(-1, 2) + MARGIN
+	shape = (points[:, 1].max() + 1 + MARGIN, points[:, 0].max() + 1 + MARGIN)
+	cell_x, cell_y = np.array(cells, dtype=np.intp).reshape(-1, 2).T + MARGIN
+	wall = np.zeros(shape, dtype=bool)
+	if walls:
+		wall_x, wall_y = np.array(list(walls), dtype=np.intp).T + MARGIN
+		wall[wall_y, wall_x] = True
+	floor = np.zeros(shape, dtype=bool)
+	floor[cell_y, cell_x] = ~wall[cell_y, cell_x]
+
+	# pullable[d][y, x]: a box on (x, y) can be pulled there from one cell back
+	# along direction d, the player standing on the next cell along it
+	pullable = [floor & ~np.roll(wall, (-dy, -dx), axis=(0, 1)) for dx, dy in VECTORS]
+
+	distance = np.full((len(goals),) + shape, UNREACHED, dtype=np.int16)
+	frontier = np.zeros((len(goals),) + shape, dtype=bool)
+	if goals:
+		goal_x, goal_y = np.array(goals, dtype=np.intp).T + MARGIN
+		frontier[np.arange(len(goals)), goal_y, goal_x] = True
+	distance[frontier] = 0
+	steps = 0
+	while frontier.any():
+		steps += 1
+		reached = np.zeros_like(frontier)
+		for (dx, dy), mask in zip(VECTORS, pullable):
+			reached |= np.roll(frontier, (dy, dx), axis=(1, 2)) & mask
+		frontier = reached & (distance == UNREACHED)
+		distance[frontier] = steps
+
+	distance = distance[:, cell_y, cell_x]
+	return distance, (distance == UNREACHED).all(axis=0)
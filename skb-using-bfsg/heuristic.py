@@ -0,0 +1,225 @@
+import math
+import sys
+from collections import OrderedDict
+from itertools import permutations
+from time import perf_counter_ns
+import numpy as np
+from bitboard import iter_bits
+
+
+#------------------------
+# Heuristic Subsystem
+#------------------------
+UNREACHABLE = 10**6 # stands in for unreached (negative) distances so costs stay ints
+INF = float('inf')
+# evaluate_batch() tries every assignment of boxes to goals at once up to this
+# many assignments, and runs the matching per row above it or when there are
+# more boxes than goals
+MAX_ASSIGNMENTS = 720
+# Elements of the states x assignments x boxes array evaluate_batch() builds at a time
+BATCH_ELEMENTS = 1 << 22
+
+
+class Cancelled(Exception):
+	"""Raised by a Heuristic call once `cancelled` is set."""
+
+
+class Heuristic:
+	"""Minimum-cost matching of boxes to goals on a goals x cells matrix of push
+	distances, as gridanalysis.analyse() gives them for `cells`, memoized per
+	box set in a bounded LRU cache.
+
+	Boxes are rows and goals are columns of the matching (the other way round
+	on levels with more boxes than goals). Before expanding a
+	node the search sets `parent` to its boxes; a child whose box set differs
+	from the parent's by one box then re-augments just that row from the
+	parent's cached matching instead of solving from scratch.
+
+	With a Board the boxes are masks, otherwise canonical tuples of points.
+	`calls`, `hits`, `incremental` and `time_ns`, the time spent in calls, are
+	counted for the solve metrics. Every search calls the heuristic for each new
+	node or checks `cancelled` itself, so setting `cancelled` from another thread
+	stops it with Cancelled."""
+
+	def __init__(self, distance, cells, board=None, cache_size=1 << 16):
+		distance = np.asarray(distance)
+		rows = np.where(distance < 0, UNREACHABLE, distance).T.tolist()
+		if board is None:
+			self.rows = dict(zip(cells, rows))
+			self.positions = tuple
+		else:
+			self.rows = rows
+			self.positions = lambda boxes: tuple(iter_bits(boxes))
+		self.num_goals = len(distance)
+		self.table = None
+		self.assignments = dict()
+		self.cache = OrderedDict()
+		self.cache_size = cache_size
+		self.parent = None
+		self.calls = 0
+		self.hits = 0
+		self.incremental = 0
+		self.time_ns = 0
+		self.cancelled = False
+
+	def __call__(self, boxes):
+		if self.cancelled:
+			raise Cancelled
+		start = perf_counter_ns()
+		value = self.evaluate(boxes)
+		self.time_ns += perf_counter_ns() - start
+		return value
+
+	def evaluate(self, boxes):
+		self.calls += 1
+		entry = self.cache.get(boxes)
+		if entry is not None:
+			self.hits += 1
+			self.cache.move_to_end(boxes)
+			return entry[0]
+
+		entry = self.cache.get(self.parent)
+		positions = self.positions(boxes)
+		if entry is not None and len(positions) == self.num_goals:
+			moved = set(entry[1]).symmetric_difference(positions)
+		else:
+			moved = ()
+		if len(moved) == 2:
+			self.incremental += 1
+			entry = self.rematch(entry, moved)
+		else:
+			entry = self.match(positions)
+
+		self.cache[boxes] = entry
+		if len(self.cache) > self.cache_size:
+			self.cache.popitem(last=False)
+		return entry[0]
+
+	def evaluate_batch(self, positions):
+		"""Heuristic values of many states in one call: `positions` is a states
+		x boxes array of box cells (Board mode) and the result an int64 array.
+		The minimum over every box-to-goal assignment is the same cost the
+		matching finds; the LRU cache isn't used."""
+		if self.cancelled:
+			raise Cancelled
+		start = perf_counter_ns()
+		self.calls += len(positions)
+		boxes = positions.shape[1]
+		if boxes > self.num_goals or math.perm(self.num_goals, boxes) > MAX_ASSIGNMENTS:
+			values = np.array([self.match(tuple(row))[0] for row in positions.tolist()], dtype=np.int64)
+		else:
+			if self.table is None:
+				self.table = np.array(self.rows, dtype=np.int64).reshape(len(self.rows), self.num_goals)
+			assignments = self.assignments.get(boxes)
+			if assignments is None:
+				assignments = np.array(list(permutations(range(self.num_goals), boxes)), dtype=np.intp)
+				self.assignments[boxes] = assignments
+			costs = self.table[positions] # states x boxes x goals
+			step = max(1, BATCH_ELEMENTS // (len(assignments) * boxes))
+			values = np.empty(len(positions), dtype=np.int64)
+			for i in range(0, len(positions), step):
+				values[i:i + step] = costs[i:i + step, np.arange(boxes), assignments].sum(axis=2).min(axis=1)
+		self.time_ns += perf_counter_ns() - start
+		return values
+
+	def shrink(self, cache_size):
+		"""Lowers `cache_size`, evicting the least recently used entries."""
+		self.cache_size = min(self.cache_size, cache_size)
+		while len(self.cache) > self.cache_size:
+			self.cache.popitem(last=False)
+
+	def nbytes(self):
+		"""Estimate of the cache, sized from its newest entry."""
+		if not self.cache:
+			return 0
+		boxes, entry = next(reversed(self.cache.items()))
+		entry_bytes = sys.getsizeof(boxes) + sum(sys.getsizeof(field) for field in entry) + sys.getsizeof(entry)
+		return sys.getsizeof(self.cache) + len(self.cache) * entry_bytes
+
+	def match(self, positions):
+		costs = [None] + [self.rows[position] for position in positions]
+		if len(positions) > self.num_goals:
+			# More boxes than goals: the matching needs rows <= columns, so the
+			# goals become the rows. rematch() only runs on square matchings
+			costs = [None] + [list(column) for column in zip(*costs[1:])]
+		m = len(costs[1]) if len(costs) > 1 else self.num_goals
+		u = [0] * len(costs)
+		v = [0] * (m + 1)
+		p = [0] * (m + 1)
+		for i in range(1, len(costs)):
+			augment(costs, u, v, p, i)
+		return (total(costs, p), positions, u, v, p)
+
+	def rematch(self, entry, moved):
+		_, positions, u, v, p = entry
+		(old,) = moved.intersection(positions)
+		(new,) = moved.difference(positions)
+		i = positions.index(old) + 1
+		positions = positions[:i - 1] + (new,) + positions[i:]
+		u = u[:]
+		v = v[:]
+		p = [0 if row == i else row for row in p]
+		costs = [None] + [self.rows[position] for position in positions]
+		augment(costs, u, v, p, i)
+		return (total(costs, p), positions, u, v, p)
+
+
+def augment(costs, u, v, p, i):
+	"""Adds row i to a matching with feasible potentials u, v along one
+	shortest augmenting path (Hungarian method, 1-indexed, p[column] = row)."""
+	m = len(v) - 1
+	minv = [INF] * (m + 1)
+	way = [0] * (m + 1)
+	used = [False] * (m + 1)
+	p[0] = i
+	j0 = 0
+	while True:
+		used[j0] = True
+		i0 = p[j0]
+		row = costs[i0]
+		delta = INF
+		j1 = 0
+		for j in range(1, m + 1):
+			if not used[j]:
+				cur = row[j - 1] - u[i0] - v[j]
+				if cur < minv[j]:
+					minv[j] = cur
+					way[j] = j0
+				if minv[j] < delta:
+					delta = minv[j]
+					j1 = j
+		for j in range(m + 1):
+			if used[j]:
+				u[p[j]] += delta
+				v[j] -= delta
+			else:
+				minv[j] -= delta
+		j0 = j1
+		if p[j0] == 0:
+			break
+	while j0:
+		j1 = way[j0]
+		p[j0] = p[j1]
+		j0 = j1
+
+def total(costs, p):
+	return sum(costs[p[j]][j - 1] for j in range(1, len(p)) if p[j])
+
+
+if __name__ == '__main__':
+	# Regression check of the matching against scipy on random square and
+	# rectangular cost matrices, more boxes than goals among them
+	import random
+	from scipy.optimize import linear_sum_assignment
+	rng = random.Random(0)
+	for trial in range(2000):
+		boxes, goals = rng.randint(1, 7), rng.randint(1, 7)
+		distance = np.array([[rng.choice((rng.randrange(30), -1)) for _ in range(boxes)] for _ in range(goals)])
+		heuristic = Heuristic(distance, list(range(boxes)))
+		costs = np.where(distance < 0, UNREACHABLE, distance).T
+		rows, columns = linear_sum_assignment(costs)
+		expected = int(costs[rows, columns].sum())
+		assert heuristic.match(tuple(range(boxes)))[0] == expected, (distance, expected)
+		batch = Heuristic(distance, list(range(boxes)), board=True)
+		assert batch.evaluate_batch(np.array([list(range(boxes))]))[0] == expected, (distance, expected)
+	print("Matching agrees with scipy on {} cost matrices".format(trial + 1))
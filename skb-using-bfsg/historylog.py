@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+from datetime import datetime
+
+
+#------------------------
+# History Log
+#------------------------
+# Every solve recorded by the GUI, appended as one JSON object per line to
+# HISTORY, so recording costs the same however long the history gets. INDEX gets
+# a line [byte offset, level, algorithm] per record, so read() seeks straight to
+# the records it wants, newest first, without parsing the rest of the log.
+#
+#   python historylog.py --level Testcases/7.txt --algorithm A* -n 5
+HISTORY = os.path.join("Results", "history.jsonl")
+INDEX = os.path.join("Results", "history.idx")
+TIME_FORMAT = "%d/%m/%Y %H:%M:%S %p"
+
+
+class HistoryLog:
+
+	def __init__(self, filename=HISTORY, index=INDEX):
+		self.filename = filename
+		self.index = index
+
+	def append(self, record):
+		"""Adds `record` (a dict with at least "level" and "algorithm") to the
+		log and the index."""
+		os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+		with open(self.filename, 'ab') as f:
+			offset = f.seek(0, os.SEEK_END)
+			f.write((json.dumps(record) + "\n").encode())
+		with open(self.index, 'a') as f:
+			f.write(json.dumps([offset, record["level"], record["algorithm"]]) + "\n")
+
+	def entries(self):
+		"""The index, in the order the records were logged. Records the index is
+		missing, when it was deleted or a crash came between the two appends,
+		are indexed from the log first."""
+		entries = []
+		if os.path.exists(self.index):
+			with open(self.index, 'r') as f:
+				for line in f:
+					try:
+						entries.append(json.loads(line))
+					except ValueError: # a line cut short by a crash
+						continue
+		if not os.path.exists(self.filename):
+			return entries
+		missing = []
+		with open(self.filename, 'rb') as f:
+			if entries:
+				f.seek(entries[-1][0])
+				f.readline()
+			while True:
+				offset = f.tell()
+				line = f.readline()
+				if not line:
+					break
+				try:
+					record = json.loads(line)
+				except ValueError:
+					continue
+				missing.append([offset, record["level"], record["algorithm"]])
+		if missing:
+			with open(self.index, 'a') as f:
+				f.writelines(json.dumps(entry) + "\n" for entry in missing)
+		return entries + missing
+
+	def read(self, level=None, algorithm=None, limit=None):
+		"""Yields the records of `level` and `algorithm` (None for any), newest
+		first, at most `limit` of them."""
+		entries = [offset for offset, entry_level, entry_algorithm in reversed(self.entries())
+				   if level in (None, entry_level) and algorithm in (None, entry_algorithm)]
+		if not entries:
+			return
+		with open(self.filename, 'rb') as f:
+			for offset in entries[:limit]:
+				f.seek(offset)
+				yield json.loads(f.readline())
+
+
+def new_record(level, algorithm, solution, steps, generated, repeated, explored, memory, duration):
+	return {
+		"time": datetime.now().strftime(TIME_FORMAT),
+		"level": level,
+		"algorithm": algorithm,
+		"solution": solution,
+		"steps": steps,
+		"generated": generated,
+		"repeated": repeated,
+		"explored": explored,
+		"memory": memory,
+		"duration": duration,
+	}
+
+def format_record(record):
+	"""A record in the layout of the old text history."""
+	return "\n".join([
+		"Datatime (UTC+7): " + record["time"],
+		"Problem: " + record["level"],
+		"Algorithm: " + record["algorithm"],
+		"Solution: " + record["solution"],
+		"Number of steps: " + str(record["steps"]),
+		"Nodes generated: " + str(record["generated"]),
+		"Nodes repeated: " + str(record["repeated"]),
+		"Nodes explored: " + str(record["explored"]),
+		"Memory: " + str(record["memory"]) + " MB",
+		"Duration: " + str(record["duration"]) + " secs",
+	]) + "\n"
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="Solves recorded by the GUI, newest first")
+	parser.add_argument("--level", help="e.g. Testcases/7.txt")
+	parser.add_argument("--algorithm", help="Manually, BFSG, A* or IDA*")
+	parser.add_argument("-n", type=int, default=10, help="number of records")
+	args = parser.parse_args()
+
+	for record in HistoryLog().read(args.level, args.algorithm, args.n):
+		print(format_record(record))
@@ -0,0 +1,77 @@
+import hashlib
+import os
+import numpy as np
+from gridanalysis import analyse
+from solver import parse_level
+
+
+#------------------------
+# Compiled Level Cache
+#------------------------
+# The parsed grid and static analysis of a level, stored as .npy arrays in
+# CACHE_DIR/<hash of the level's text>/ and memory-mapped on load:
+#   meta.npy     - int32 [x, y, player x, player y] as set_value() returns them
+#   grid.npy     - uint8 characters of the file, one row per line
+#   cells.npy    - int16 (x, y) of every floor cell, in bitboard.Board order
+#   distance.npy - int16 pushes from each cell to each goal (goals sorted),
+#                  UNREACHED where a box can't reach the goal
+#   dead.npy     - bool, the dead squares among the cells
+# distance and dead are gridanalysis.analyse()'s arrays, handed on as they are
+CACHE_DIR = os.path.join("Cache", "levels")
+VERSION = 1 # part of the key, bump it when the layout or the analysis changes
+
+
+def level_hash(data):
+	return hashlib.sha1(b"%d:" % VERSION + data).hexdigest()
+
+def load_level(filename):
+	"""set_value() and gridanalysis.analyse() for a level file, compiled on the
+	first call. Returns walls, goals, boxes, paths, player, x, y, distance, dead."""
+	with open(filename, 'r') as f:
+		return load_text(f.read())
+
+def load_text(text):
+	"""load_level() for a level in the custom notation."""
+	data = text.encode()
+	path = os.path.join(CACHE_DIR, level_hash(data))
+	if not os.path.exists(path):
+		compile_level(data, path)
+	return read_level(path)
+
+def compile_level(data, path):
+	walls, goals, boxes, paths, player, x, y = parse_level(data.decode())
+	cells = sorted(paths, key=lambda point: (point[1], point[0]))
+	distance, dead = analyse(walls, goals, cells)
+	lines = data.decode().split('\n')
+	grid = np.full((len(lines), max(len(line) for line in lines)), ord(' '), dtype=np.uint8)
+	for row, line in enumerate(lines):
+		grid[row, :len(line)] = np.frombuffer(line.encode(), dtype=np.uint8)
+	arrays = {
+		"meta": np.array([x, y, player[0], player[1]], dtype=np.int32),
+		"grid": grid,
+		"cells": np.array(cells, dtype=np.int16).reshape(len(cells), 2),
+		"distance": distance,
+		"dead": dead,
+	}
+	# Written next to the final directory and renamed, so readers never see half a level
+	temp = "{}.{}.tmp".format(path, os.getpid())
+	os.makedirs(temp)
+	for name, array in arrays.items():
+		np.save(os.path.join(temp, name + ".npy"), array)
+	try:
+		os.rename(temp, path)
+	except OSError: # compiled by another process in the meantime
+		for name in arrays:
+			os.remove(os.path.join(temp, name + ".npy"))
+		os.rmdir(temp)
+
+def read_level(path):
+	arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode='r')
+			  for name in ("meta", "grid", "cells", "distance", "dead")}
+	x, y, player_x, player_y = arrays["meta"].tolist()
+	grid = arrays["grid"]
+	walls = set(map(tuple, np.argwhere(grid == ord('#'))[:, ::-1].tolist()))
+	goals = set(map(tuple, np.argwhere(np.isin(grid, np.frombuffer(b"?-+", dtype=np.uint8)))[:, ::-1].tolist()))
+	boxes = tuple(map(tuple, np.argwhere(np.isin(grid, np.frombuffer(b"x+", dtype=np.uint8)))[:, ::-1].tolist()))
+	cells = set(map(tuple, arrays["cells"].tolist()))
+	return walls, goals, boxes, cells, (player_x, player_y), x, y, arrays["distance"], arrays["dead"]
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import re
+from array import array
+
+
+#------------------------
+# Level Collections
+#------------------------
+# Levels come either from a directory of one level per file, named 1.txt, 2.txt,
+# ... (the Testcases here), or from a pack file holding any number of levels, one
+# after another, separated by blank, title or comment lines. Both notations are
+# read, level by level:
+#   custom: # wall, . floor, x box, ? goal, @ player, + box on goal, - player on goal
+#   XSB:    # wall, space - _ floor, $ box, . goal, @ player, * box on goal, + player on goal
+# A level with a $ or * is XSB and is turned into the custom notation, so the
+# rest of the solver only ever parses that. Run-length encoded rows aren't read.
+#
+# The byte range of every level in a pack is indexed on the first access and
+# kept in INDEX_DIR, so level N is one seek and read, however big the pack.
+INDEX_DIR = os.path.join("Cache", "packs")
+VERSION = 1 # part of the key, bump it when the way levels are split changes
+BOARD_CHARS = set("#@+$*.-_ x?")
+XSB = {'#': '#', '$': 'x', '.': '?', '@': '@', '*': '+', '+': '-'}
+XSB_FLOOR = " -_"
+
+
+def is_board_line(line):
+	return '#' in line and set(line) <= BOARD_CHARS
+
+def blocks(f):
+	"""Yields (start, end, lines) for each level in the binary file `f`, start
+	and end being the byte offsets of its first line and after its last."""
+	start = end = None
+	lines = []
+	offset = f.tell()
+	for raw in f:
+		line = raw.decode(errors='replace').rstrip('\r\n')
+		if is_board_line(line):
+			if start is None:
+				start = offset
+			lines.append(line)
+			end = offset + len(raw)
+		elif start is not None:
+			yield start, end, lines
+			start = None
+			lines = []
+		offset += len(raw)
+	if start is not None:
+		yield start, end, lines
+
+def to_custom(lines):
+	"""The level in the custom notation, as set_value() reads it."""
+	if not any('$' in line or '*' in line for line in lines):
+		return "\n".join(lines)
+	width = max(len(line) for line in lines)
+	grid = [line.ljust(width) for line in lines]
+	# The floor is what the player can reach; spaces outside the walls stay spaces
+	start = next((x, y) for y, line in enumerate(grid) for x, char in enumerate(line) if char in "@+")
+	reached = {start}
+	stack = [start]
+	while stack:
+		x, y = stack.pop()
+		for neighbor in ((x, y - 1), (x - 1, y), (x, y + 1), (x + 1, y)):
+			if (0 <= neighbor[1] < len(grid) and 0 <= neighbor[0] < width and neighbor not in reached
+					and grid[neighbor[1]][neighbor[0]] != '#'):
+				reached.add(neighbor)
+				stack.append(neighbor)
+	rows = []
+	for y, line in enumerate(grid):
+		rows.append("".join(('.' if (x, y) in reached else ' ') if char in XSB_FLOOR else XSB[char]
+							for x, char in enumerate(line)))
+	return "\n".join(rows)
+
+
+class LevelDirectory:
+
+	def __init__(self, path):
+		self.path = path
+		self.files = sorted((name for name in os.listdir(path) if re.fullmatch(r"\d+\.txt", name)),
+							key=lambda name: int(name[:-4]))
+
+	def __len__(self):
+		return len(self.files)
+
+	def __iter__(self):
+		for n in range(len(self)):
+			yield self.text(n)
+
+	def name(self, n):
+		return os.path.join(self.path, self.files[n])
+
+	def text(self, n):
+		with open(self.name(n), 'r') as f:
+			text = f.read()
+		if '$' not in text and '*' not in text:
+			return text
+		return to_custom([line for line in text.splitlines() if is_board_line(line)])
+
+
+class LevelPack:
+
+	def __init__(self, path):
+		self.path = path
+		self.offsets = None # array of start, end byte offsets, two per level
+
+	def index_path(self):
+		stat = os.stat(self.path)
+		key = "{}:{}:{}:{}".format(VERSION, os.path.abspath(self.path), stat.st_size, stat.st_mtime_ns)
+		return os.path.join(INDEX_DIR, hashlib.sha1(key.encode()).hexdigest() + ".idx")
+
+	def index(self):
+		"""Loads the index of the pack, building it on the first use."""
+		if self.offsets is not None:
+			return self.offsets
+		path = self.index_path()
+		self.offsets = array('q')
+		if os.path.exists(path):
+			with open(path, 'rb') as f:
+				self.offsets.frombytes(f.read())
+			return self.offsets
+		with open(self.path, 'rb') as f:
+			for start, end, _ in blocks(f):
+				self.offsets.extend((start, end))
+		# Written next to the final file and renamed, so readers never see half an index
+		os.makedirs(INDEX_DIR, exist_ok=True)
+		temp = "{}.{}.tmp".format(path, os.getpid())
+		with open(temp, 'wb') as f:
+			self.offsets.tofile(f)
+		os.replace(temp, path)
+		return self.offsets
+
+	def __len__(self):
+		return len(self.index()) // 2
+
+	def __iter__(self):
+		"""Streams the levels from the file, without the index."""
+		with open(self.path, 'rb') as f:
+			for _, _, lines in blocks(f):
+				yield to_custom(lines)
+
+	def name(self, n):
+		return "{}:{}".format(self.path, n + 1)
+
+	def text(self, n):
+		offsets = self.index()
+		if not 0 <= n < len(offsets) // 2:
+			raise IndexError("{} has no level {}".format(self.path, n + 1))
+		start, end = offsets[2 * n], offsets[2 * n + 1]
+		with open(self.path, 'rb') as f:
+			f.seek(start)
+			data = f.read(end - start)
+		return to_custom(data.decode(errors='replace').splitlines())
+
+
+def open_levels(path):
+	"""A LevelDirectory or LevelPack: len() levels, name(n) and text(n) of level
+	n (from 0), iterating yields the texts in order."""
+	return LevelDirectory(path) if os.path.isdir(path) else LevelPack(path)
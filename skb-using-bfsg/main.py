@@ -3,12 +3,12 @@ import time
 from pygame.locals import *
 import os
 import psutil
-from queue import Queue
+import threading
 from copy import copy, deepcopy
-from datetime import datetime
-from sortedcontainers import SortedList
-import numpy as np
-from scipy.optimize import linear_sum_assignment
+import solver
+from solver import load_level_number, is_win, U, L, D, R
+from metrics import SolveMetrics
+from historylog import HistoryLog, new_record
 
 #-----------------
 # Setting Pygame
@@ -75,12 +75,27 @@ pushed = 0
 startTime = 0
 stepNode = 0
 visualized = 0
-moves = []
 history = 0
 name = ''
 actions = []
 ptr = -1
 itemMemory = psutil.Process(os.getpid()).memory_info().rss/(1024*1024)
+solving = None # solver.SearchMonitor of the search running in the background
+solve_failed = None # message shown when the last search ended without a solution
+
+# Playback of a found solution: `actions` holds all of it and the board is at
+# step ptr + 1. A move is played every PLAYBACK_INTERVAL ms of clock.tick() time,
+# scaled by the selected speed
+PLAYBACK_INTERVAL = 300
+PLAYBACK_SPEEDS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+playing = False
+speed = PLAYBACK_SPEEDS.index(1)
+playback_clock = 0
+
+# What is on screen, so draw_board() only redraws what changed
+board_layer = None # draw_static_board() of the current level
+drawn_menu = None # menu_state() when the menu was last drawn
+drawn_pieces = None # {tile: sprite} of the player and boxes
 
 #---------------------
 # Setup Items 
@@ -88,17 +103,20 @@ itemMemory = psutil.Process(os.getpid()).memory_info().rss/(1024*1024)
 background = pygame.image.load("Items/background.jpg")
 background = pygame.transform.scale(background, (WIDTH, WIDTH))
 
-wall = pygame.image.load('Items/wall.png')
-wall = pygame.transform.scale(wall, (lengthSquare, lengthSquare))
+# Tiles are loaded once and scaled once per tile size, see sprite()
+images = {item: pygame.image.load('Items/{}.png'.format(item)) for item in ("wall", "box", "goal", "player")}
+sprites = dict()
 
-box = pygame.image.load('Items/box.png')
-box = pygame.transform.scale(box, (lengthSquare, lengthSquare))
+def sprite(item, size):
+	key = (item, size)
+	if key not in sprites:
+		sprites[key] = pygame.transform.scale(images[item], (size, size))
+	return sprites[key]
 
-goal = pygame.image.load('Items/goal.png')
-goal = pygame.transform.scale(goal, (lengthSquare, lengthSquare))
-
-player_ = pygame.image.load('Items/player.png')
-player_ = pygame.transform.scale(player_, (lengthSquare, lengthSquare))
+wall = sprite("wall", lengthSquare)
+box = sprite("box", lengthSquare)
+goal = sprite("goal", lengthSquare)
+player_ = sprite("player", lengthSquare)
 
 up_arrow = pygame.image.load("Items/up_arrow.png")
 up_arrow = pygame.transform.scale(up_arrow, (20, 20))
@@ -125,9 +143,10 @@ redo_button = pygame.transform.scale(redo_button, (35, 35))
 up_arrow_rect = Rect(600 + 245, 0 + 152, 20, 20)
 down_arrow_rect = Rect(600 + 245, 0 + 172, 20, 20)
 pick_rect = Rect(600 + 400, 0 + 178, 98, 41)
-self_rect = Rect(700 + 40, 305, 110, 48)
-bfs_rect = Rect(700 + 165, 305, 95, 48)
-A_rect = Rect(700 + 275, 305, 95, 48)
+self_rect = Rect(700 + 10, 305, 110, 48)
+bfs_rect = Rect(700 + 130, 305, 80, 48)
+A_rect = Rect(700 + 220, 305, 80, 48)
+ida_rect = Rect(700 + 310, 305, 80, 48)
 restart_rect = Rect(700 + 160, 0 + 410, 105, 40)
 visualize_rect = Rect(700 + 135, 0 + 500, 161, 34)
 undo_rect = Rect(700 + 90, 0 + 410, 50, 40)
@@ -137,15 +156,22 @@ redo_rect = Rect(700 + 285, 0 + 410, 50, 40)
 #---------------------
 # Setup Displays
 #---------------------
+# Labels are rendered once; only the search progress and playback lines, which
+# change as they go, are rendered each time they are drawn
+texts = dict()
+
+def render_text(font, text, color):
+	key = (font, text, color)
+	if key not in texts:
+		texts[key] = font.render(text, True, color)
+	return texts[key]
+
 def display_title():
-	menuText = menuFont.render("SOKOBAN", True, ORANGE)
+	menuText = render_text(menuFont, "SOKOBAN", ORANGE)
 	surface.blit(menuText, [700 + 35, 0 + 20])
 
-def display_background():
-	surface.blit(background, [0, 0])
-
 def display_title_step_1(color = RED):
-	step1Text = helpFont.render("Choose level", True, color)
+	step1Text = render_text(helpFont, "Choose level", color)
 	surface.blit(step1Text, [700 + 10, 0 + 105])
 
 def display_up_arrow():
@@ -159,7 +185,7 @@ def display_pick_button():
 	surface.blit(pick_button, [600 + 400, 0 + 178])
 
 def display_title_content_1(color = BROWN):
-	attemptedText = helpFont.render("Level:", True, color)
+	attemptedText = render_text(helpFont, "Level:", color)
 	surface.blit(attemptedText, [700 + 30, 0 + 152])
 
 
@@ -170,37 +196,47 @@ def check_one_digit(n):
 
 def display_level(color = GRAY_LIGHT):
 	# Check if 2 digits
-	levelText = levelFont.render(f"{level + 1}", True, color)
+	levelText = render_text(levelFont, f"{level + 1}", color)
 	if check_one_digit(level):
 		surface.blit(levelText, [700 + 115, 0 + 152])
 	else:
 		surface.blit(levelText, [700 + 105, 0 + 152])
 
 def display_help():
-	helpText = levelFont.render("(1-40)", True, BROWN)
+	helpText = render_text(levelFont, "(1-{})".format(len(solver.level_collection())), BROWN)
 	surface.blit(helpText, [700 + 185, 0 + 152])
 
 def display_title_step_2(color = RED):
-	step2Text = helpFont.render("Choose mode", True, color)
+	step2Text = render_text(helpFont, "Choose mode", color)
 	surface.blit(step2Text, [700 + 10, 0 + 252])
 
 
 def display_button_self():
-	pygame.draw.rect(surface, BLACK, pygame.Rect(700 + 40, 305, 110, 48),  0, 6)
-	step7Text = buttonFont.render("Manually", True, GREEN)
-	surface.blit(step7Text, [700 + 45, 318])
+	pygame.draw.rect(surface, BLACK, pygame.Rect(700 + 10, 305, 110, 48),  0, 6)
+	step7Text = render_text(buttonFont, "Manually", GREEN)
+	surface.blit(step7Text, [700 + 15, 318])
 
 def display_button_BFS():
-	pygame.draw.rect(surface, BLACK, pygame.Rect(700 + 170, 306, 95, 48),  0, 6)
-	step7Text = buttonFont.render("BFSG", True, PINK)
-	surface.blit(step7Text, [700 + 190, 318])
+	pygame.draw.rect(surface, BLACK, pygame.Rect(700 + 130, 305, 80, 48),  0, 6)
+	step7Text = render_text(buttonFont, "BFSG", PINK)
+	surface.blit(step7Text, [700 + 145, 318])
+
+def display_button_A():
+	pygame.draw.rect(surface, BLACK, pygame.Rect(700 + 220, 305, 80, 48),  0, 6)
+	step7Text = render_text(buttonFont, "A*", YELLOW)
+	surface.blit(step7Text, [700 + 248, 318])
+
+def display_button_IDA():
+	pygame.draw.rect(surface, BLACK, pygame.Rect(700 + 310, 305, 80, 48),  0, 6)
+	step7Text = render_text(buttonFont, "IDA*", ORANGE)
+	surface.blit(step7Text, [700 + 328, 318])
 
 def display_restart():
 	surface.blit(restart_button, [700 + 160, 0 + 410])
 
 def display_visualize():
 	pygame.draw.rect(surface, BLACK, pygame.Rect(700 + 165, 500, 95, 48), 0, 6)
-	step7Text = buttonFont.render("Auto", True, BLUE)
+	step7Text = render_text(buttonFont, "Auto", BLUE)
 	surface.blit(step7Text, [700 + 190, 510])
 
 def display_undo():
@@ -229,10 +265,16 @@ def display_step_2(col = RED, mode = 0):
 	if mode == 0:
 		display_button_self()
 		display_button_BFS()
+		display_button_A()
+		display_button_IDA()
 	elif mode == 1:
 		display_button_self()
 	elif mode == 2:
 		display_button_BFS()
+	elif mode == 3:
+		display_button_A()
+	elif mode == 4:
+		display_button_IDA()
 
 def display_step_3(col = RED, mode = 0):
 	if step == 3:
@@ -241,11 +283,34 @@ def display_step_3(col = RED, mode = 0):
 		display_restart()
 
 		if mode > 1 and win == 1:
-			display_visualize()
+			if visualized == 0:
+				display_visualize()
+			else:
+				display_playback()
+		if mode > 1 and win == 0:
+			display_progress()
+
+def display_progress():
+	if solve_failed:
+		progressText = render_text(recordFont, solve_failed, RED)
+	elif solving is not None:
+		progressText = recordFont.render("Searching... Nodes: {} ({:.0f}/s)  Frontier: {}".format(
+			solving.nodes, solving.nodes_per_sec, solving.frontier_size), True, WHITE)
+	else:
+		return
+	surface.blit(progressText, [700 + 10, 0 + 500])
+
+def display_playback():
+	stateText = recordFont.render("Step {}/{}   Speed x{:g}   {}".format(
+		ptr + 1, len(actions), PLAYBACK_SPEEDS[speed], "Playing" if playing else "Paused"), True, WHITE)
+	surface.blit(stateText, [700 + 10, 0 + 500])
+	keysText = render_text(recordFont, "Space: play/pause  Up/Down: speed  Left/Right: step", GRAY_LIGHT)
+	surface.blit(keysText, [700 + 10, 0 + 525])
+	seekText = render_text(recordFont, "Home/End: start/end  0-9: jump to 0-90%", GRAY_LIGHT)
+	surface.blit(seekText, [700 + 10, 0 + 550])
 	
 def draw_menu():
 	pygame.draw.rect(surface, BLUE_LIGHT, [700, 0, 1050, 700])
-	display_background()
 
 	if step == 1:
 		display_step_1(YELLOW, -1)
@@ -263,27 +328,71 @@ def draw_menu():
 		elif win == 1:
 			display_step_3(GREEN_DARK, mode = mode)
 
-def draw_board():
-	draw_menu()
+def menu_state():
+	"""Everything the menu shows; it is redrawn when this changes."""
+	state = (step, mode, win, level, visualized, solve_failed)
+	if step == 3 and mode > 1 and win == 0 and solving is not None:
+		state += (solving.nodes, solving.frontier_size)
+	if visualized == 1:
+		state += (ptr, len(actions), speed, playing)
+	return state
+
+def tile_rect(point):
+	return Rect(offsetX + lengthSquare * point[0], offsetY + lengthSquare * point[1], lengthSquare, lengthSquare)
+
+def draw_static_board():
+	"""Background, walls, floor and goals of the level, drawn once per level."""
+	layer = pygame.Surface((WIDTH, WIDTH))
+	layer.blit(background, [0, 0])
 
 	for point in walls:
-		surface.blit(wall, [offsetX + lengthSquare * point[0], offsetY + lengthSquare * point[1]])
+		layer.blit(wall, tile_rect(point))
 	
 	for point in paths:
-		pygame.draw.rect(surface, WHITE, [offsetX + lengthSquare * point[0], offsetY + lengthSquare * point[1], lengthSquare, lengthSquare])
-
+		pygame.draw.rect(layer, WHITE, tile_rect(point))
 
 	for point in goals:
-		surface.blit(goal, [offsetX + lengthSquare * point[0], offsetY + lengthSquare * point[1]])
+		layer.blit(goal, tile_rect(point))
+	return layer
 
-	point = player
-	surface.blit(player_, [offsetX + lengthSquare * point[0], offsetY + lengthSquare * point[1]])
+def draw_board():
+	"""Redraws what changed since the last frame: the menu if menu_state()
+	changed, and only the tiles the player or a box moved from or to."""
+	global board_layer, drawn_menu, drawn_pieces
+	dirty = []
+
+	state = menu_state()
+	if state != drawn_menu:
+		draw_menu()
+		display_title()
+		drawn_menu = state
+		dirty.append(Rect(700, 0, HEIGHT - 700, WIDTH))
+
+	pieces = {point: box for point in boxes}
+	pieces[player] = player_
+	if board_layer is None:
+		board_layer = draw_static_board()
+		surface.blit(board_layer, [0, 0])
+		changed = pieces
+		dirty.append(Rect(0, 0, WIDTH, WIDTH))
+	else:
+		changed = {point: pieces.get(point) for point in set(pieces) | set(drawn_pieces)
+				   if pieces.get(point) is not drawn_pieces.get(point)}
+	for point, piece in changed.items():
+		rect = tile_rect(point)
+		surface.blit(board_layer, rect, rect)
+		if piece is not None:
+			surface.blit(piece, rect)
+		dirty.append(rect)
+	drawn_pieces = pieces
 
-	for point in boxes:
-		surface.blit(box, [offsetX + lengthSquare * point[0], offsetY + lengthSquare * point[1]])
+	if dirty:
+		pygame.display.update(dirty)
 
-	display_title()
-	pygame.display.flip()
+def redraw_all():
+	global board_layer, drawn_menu
+	board_layer = None
+	drawn_menu = None
 
 
 
@@ -291,15 +400,10 @@ def draw_board():
 # Refresh Data
 #-----------------
 def reset_data():
-	global numsCol, numsRow, numsUnit, lengthSquare, offsetX, offsetY, wall, box, goal, player_, walls, goals, boxes, paths, player, name, distanceToGoal, dead_squares, actions, ptr
+	global numsCol, numsRow, numsUnit, lengthSquare, offsetX, offsetY, wall, box, goal, player_, walls, goals, boxes, paths, player, name, puzzle, actions, ptr
 	
-	wall = pygame.image.load('Items/wall.png')
-	box = pygame.image.load('Items/box.png')
-	goal = pygame.image.load('Items/goal.png')
-	player_ = pygame.image.load('Items/player.png')
-	name = "./Testcases/{}.txt".format( level+1)
-	walls, goals, boxes, paths, player, numsRow, numsCol = set_value(name)
-	distanceToGoal, dead_squares = set_distance()
+	name = solver.level_collection().name(level)
+	walls, goals, boxes, paths, player, numsRow, numsCol, puzzle = load_level_number(level)
 	actions = []
 	ptr = -1
 
@@ -309,14 +413,19 @@ def reset_data():
 	offsetX = lengthSquare * (numsUnit - numsRow)/2 
 	offsetY = lengthSquare * (numsUnit - numsCol)/2 
 
-	wall = pygame.transform.scale(wall, (lengthSquare, lengthSquare))
-	box = pygame.transform.scale(box, (lengthSquare, lengthSquare))
-	goal = pygame.transform.scale(goal, (lengthSquare, lengthSquare))
-	player_ = pygame.transform.scale(player_, (lengthSquare, lengthSquare))
+	wall = sprite("wall", lengthSquare)
+	box = sprite("box", lengthSquare)
+	goal = sprite("goal", lengthSquare)
+	player_ = sprite("player", lengthSquare)
+	redraw_all()
 
 def init_data():
-	global move, win, step, timeTook, pushed, startTime, stepNode, level, board, numsRow, numsCol, numsUnit, lengthSquare, offsetX, offsetY, visualized, actions
+	global move, win, step, timeTook, pushed, startTime, stepNode, level, board, numsRow, numsCol, numsUnit, lengthSquare, offsetX, offsetY, visualized, actions, solving, solve_failed, playing, playback_clock
 	
+	if solving is not None:
+		solving.cancel()
+	solving = None
+	solve_failed = None
 	mode = 0
 	win = 0
 	step = 1
@@ -325,6 +434,8 @@ def init_data():
 	startTime = 0
 	stepNode = 0
 	visualized = 0
+	playing = False
+	playback_clock = 0
 	actions = []
 	reset_data()
 
@@ -332,52 +443,6 @@ def init_data():
 #------------------------
 # Setting Data Structures and Functionalities
 #------------------------
-class Direction:
-	def __init__(self, vector, char):
-		self.vector = vector
-		self.char = char
-
-	def get_char(self):
-		return self.char
-
-L = Direction((-1, 0), 'L')
-R = Direction((1, 0), 'R')
-U = Direction((0, -1), 'U')
-D = Direction((0, 1), 'D')
-directions = [U, L, D, R] # clock-wise
-
-
-
-def set_available_moves(player, boxes):
-	available_moves = []
-	for direction in directions:
-		if (player[0] + direction.vector[0], player[1] + direction.vector[1]) not in walls:
-			if (player[0] + direction.vector[0], player[1] + direction.vector[1]) in boxes:
-				if ((player[0] + 2*direction.vector[0], player[1] + 2*direction.vector[1]) not in walls) and ((player[0] + 2*direction.vector[0], player[1] + 2*direction.vector[1]) not in boxes):
-					available_moves.append(direction)
-			else:
-				available_moves.append(direction)
-	return available_moves
-
-def move(player, boxes, direction):	
-	temp = (player[0] + direction.vector[0], player[1] + direction.vector[1])
-	is_pushed = 0
-	res = True
-	boxes = set(boxes)
-	if temp in boxes:
-		is_pushed = 1
-		boxes.remove(temp)
-		boxes.add((player[0] + 2*direction.vector[0], player[1] + 2*direction.vector[1]))
-		
-		if (player[0] + 2*direction.vector[0], player[1] + 2*direction.vector[1]) in dead_squares:
-			res = False
-	boxes = tuple(boxes) 
-	player = temp
-	return res, is_pushed, player, boxes
-
-def is_win(goals, boxes):
-	return goals.issubset(boxes)
-
 def undo():
 	global player, boxes, ptr, stepNode, pushed
 	if ptr > -1:
@@ -395,126 +460,80 @@ def undo():
 def redo():
 	global player, boxes, ptr, stepNode, pushed
 	if ptr < len(actions) - 1:
-		_, is_pushed, player, boxes = move(player, boxes, actions[ptr + 1][0])
+		_, is_pushed, player, boxes = puzzle.move(player, boxes, actions[ptr + 1][0])
 		ptr += 1
 		stepNode += 1
 		pushed += is_pushed
 
-def set_distance():
-	distanceToGoal = dict()
-	dead_squares = set()
-	for goal in goals:
-		distanceToGoal[goal] = dict()
-		for path in paths:
-			distanceToGoal[goal][path] = 1e9
-	queue = Queue()
-	for goal in goals:
-		distanceToGoal[goal][goal] = 0
-		queue.put(goal)
-		while not queue.empty():
-			position = queue.get()
-			for direction in directions:
-				boxPosition = (position[0] + direction.vector[0], position[1] + direction.vector[1])
-				playerPosition = (position[0] + 2*direction.vector[0], position[1] + 2*direction.vector[1])
-				if boxPosition in paths:
-					if distanceToGoal[goal][boxPosition] == 1e9:
-						if (boxPosition not in walls) and (playerPosition not in walls):
-							distanceToGoal[goal][boxPosition] = distanceToGoal[goal][position] + 1
-							queue.put(boxPosition)
-	for path in paths:
-		ok = 1
-		for goal in goals:	
-			if distanceToGoal[goal][path] != 1e9:
-				ok = 0
-				break
-		if ok == 1:
-			dead_squares.add(path)
-	return distanceToGoal, dead_squares
-
-def minimum_cost(boxes):
-	temp = []
-	for goal in goals:
-		for box in boxes:
-			# Manhattan
-			temp.append(abs(goal[0] - box[0]) + abs(goal[1] - box[1]))
-
-	arr = np.array(temp)
-	cost = arr.reshape(len(goals), len(boxes))
-	row_ind, col_ind = linear_sum_assignment(cost)
-	return cost[row_ind, col_ind].sum()
-
-def set_value(filename):
-	walls = set()
-	goals = set()
-	boxes = []
-	paths = set()
-	player = None
-	x = 0
-	y = 0
-	with open(filename, 'r') as f:
-		read_data = f.read()
-		lines = read_data.split('\n')	
-		for line in lines:
-			x = 0
-			for char in line:
-				if char == '#': # Wall
-					walls.add((x,y))
-				elif char == 'x': # Box
-					boxes.append((x,y))
-					paths.add((x,y))
-				elif char == '?': # Goal
-					goals.add((x,y))
-					paths.add((x,y))
-				elif char == '@': # Player
-					player = (x,y)
-					paths.add((x,y))
-				elif char == '-': # Player and Goal
-					goals.add((x,y))
-					player = (x,y)
-					paths.add((x,y))
-				elif char == '+': # Box and Goal
-					goals.add((x,y))
-					boxes.append((x,y))
-					paths.add((x,y))
-				elif char == '.': # Path - avaiable move
-					paths.add((x,y))
-				x += 1
-			y += 1
-	return walls, goals, tuple(boxes), paths, player, x, y
+
+#-----------------
+# Solution Playback
+#-----------------
+def seek(n):
+	"""Moves the board to step n of `actions` (0 is the start) with undo() and
+	redo()."""
+	n = max(0, min(n, len(actions)))
+	while ptr + 1 > n:
+		undo()
+	while ptr + 1 < n:
+		redo()
+
+def advance_playback(elapsed):
+	"""Plays the moves that fell due in the `elapsed` ms since the last frame,
+	several of them when the speed makes the interval shorter than a frame."""
+	global playing, playback_clock
+	if not playing:
+		return
+	playback_clock += elapsed * PLAYBACK_SPEEDS[speed]
+	while playback_clock >= PLAYBACK_INTERVAL and ptr + 1 < len(actions):
+		redo()
+		playback_clock -= PLAYBACK_INTERVAL
+	if ptr + 1 == len(actions):
+		playing = False
+		playback_clock = 0
+
+def toggle_playback():
+	global playing, playback_clock
+	if not playing and ptr + 1 == len(actions):
+		seek(0)
+	playing = not playing
+	playback_clock = 0
+
+def playback_key(key):
+	"""Playback controls once a solution has been found."""
+	global speed, playing
+	if key == pygame.K_SPACE:
+		toggle_playback()
+	elif key == pygame.K_UP:
+		speed = min(speed + 1, len(PLAYBACK_SPEEDS) - 1)
+	elif key == pygame.K_DOWN:
+		speed = max(speed - 1, 0)
+	elif key == pygame.K_LEFT:
+		playing = False
+		seek(ptr)
+	elif key == pygame.K_RIGHT:
+		playing = False
+		seek(ptr + 2)
+	elif key == pygame.K_HOME:
+		seek(0)
+	elif key == pygame.K_END:
+		playing = False
+		seek(len(actions))
+	elif pygame.K_0 <= key <= pygame.K_9:
+		seek(len(actions) * (key - pygame.K_0) // 10)
 
 
 #----------------------
 # Exporting The Results
 #----------------------
 
-def line_prepender(filename, algo, sol, ste, gen, rep, expl, memo, dur):
-	if not os.path.exists('Results'):
-		os.mkdir('Results')
-	if not os.path.exists(filename):
-		open(filename, 'w+')
-	with open(filename, 'r+') as f:
-		content = f.read()
-		f.seek(0, 0)
-		dt_string = datetime.now().strftime("%d/%m/%Y %H:%M:%S %p")
-		f.write("Datatime (UTC+7): " + dt_string + '\n')
-		f.write("Problem: " + name.split('./')[-1] + '\n')
-		f.write("Algorithm: " + algo + '\n')
-		f.write("Solution: " + sol + '\n')
-		f.write("Number of steps: " + str(ste) + '\n')
-		f.write("Nodes generated: " + str(gen) + '\n')
-		f.write("Nodes repeated: " + str(rep) + '\n')
-		f.write("Nodes explored: " + str(expl) + '\n')
-		f.write("Memory: " + str(memo) + ' MB' + '\n')
-		f.write("Duration: " + str(dur) + " secs" + '\n')
-		f.write("\n\n")
-		f.write("===================================================" + '\n')
-		f.write("===================================================" + '\n')
-		f.write("\n\n")
-		f.write(content)
+# Every solve is appended to the history log, which replaces the per-level
+# Results/Solution_test N.txt files and Results/history_log.txt. Print a level's
+# solves, newest first, with `python historylog.py --level Testcases/N.txt`
+history_log = HistoryLog()
 
 def add_history(algo, sol, ste, gen, rep, expl, memo, dur):
-	line_prepender('Results/history_log.txt', algo, sol, ste, gen, rep, expl, memo, dur)
-	line_prepender('Results/Solution_test {}'.format(name.split('/')[2]), algo, sol, ste, gen, rep, expl, memo, dur)
+	history_log.append(new_record(name.split('./')[-1], algo, sol, ste, gen, rep, expl, memo, dur))
 
 def get_history_moves(actions):
 	return ", ".join(list(map(lambda move: move[0].char, actions)))
@@ -523,50 +542,61 @@ def get_history_moves(actions):
 #-----------------
 # Setting Alogorithms
 #-----------------
-def bfsg(curr_player, curr_boxes):
-	global win, timeTook, startTime
-	node_repeated = 0
-	node_generated = 0
-	frontier = SortedList(key=lambda x: minimum_cost(x[1]))
-	explored = set()
-	frontier.add((curr_player, curr_boxes, 0, 0, []))
-	node_generated += 1
-	explored.add((curr_player, curr_boxes))
-	startTime = time.time()
-	while True:
-		if len(frontier) == 0:
-			print("Solution not found\n")
-			return (0, 0, 0, 0, [])
-
-		(now_player, now_boxes, steps, push, actions) = frontier.pop(0)
-		moves = set_available_moves(now_player, now_boxes)
-		for m in moves:
-			res, is_pushed, new_player, new_boxes = move(now_player, now_boxes, m)
-			if (new_player, new_boxes) not in explored and res == True:
-				explored.add((new_player, new_boxes))
-				if is_win(goals, new_boxes):
-					timeTook = time.time() - startTime
-					win = 1
-					memo_info = psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024) - itemMemory
-					add_history("BFSG", get_history_moves(actions + [(m, is_pushed)]), steps + 1, node_generated,
-								node_repeated, len(explored), memo_info, timeTook)
-					return (node_generated + 1, steps + 1, timeTook, memo_info, actions + [(m, is_pushed)])
-				frontier.add((new_player, new_boxes, steps + 1, push + is_pushed, actions + [(m, is_pushed)]))
-			else:
-				node_repeated += 1
-			node_generated += 1
+# Optimal searches behind the A* (mode 3) and IDA* (mode 4) buttons. The engine
+# and data structures every search uses are set in solver.py
+ALGORITHMS = {3: "A*", 4: "IDA*"}
+
+def start_solve(algo):
+	"""Starts `algo` ("BFSG" or one of solver.ALGORITHMS) in a worker thread, so
+	the window keeps drawing and handling events while it searches. Restart
+	cancels it through `solving`."""
+	global solving
+	solving = solver.SearchMonitor()
+	threading.Thread(target=run_solve, args=(solving, algo, puzzle, player, boxes), daemon=True).start()
+
+def run_solve(monitor, algo, puzzle, curr_player, curr_boxes):
+	metrics = SolveMetrics(algo)
+	try:
+		monitor.result = solver.solve(puzzle, curr_player, curr_boxes, algo, metrics, monitor=monitor) + (metrics,)
+	except solver.Cancelled:
+		pass
+	except Exception as error: # e.g. MemoryError from the explored table or the memory budget
+		monitor.error = error
+	finally:
+		monitor.done = True
+
+def finish_solve(algo):
+	"""Takes the result of the finished background search and records it in the
+	history. Returns the actions of the solution, [] if there is none or the
+	search failed."""
+	global win, timeTook, solving, solve_failed
+	monitor = solving
+	solving = None
+	if monitor.result is None or monitor.result[3] is None:
+		if monitor.error is not None:
+			solve_failed = "Search failed: {}".format(str(monitor.error) or type(monitor.error).__name__)
+		else:
+			solve_failed = "Solution not found"
+		print(solve_failed + "\n")
+		return []
+	node_generated, node_repeated, explored, actions, metrics = monitor.result
+	timeTook = metrics.search_time
+	win = 1
+	memo_info = psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024) - itemMemory
+	add_history(algo, get_history_moves(actions), len(actions), node_generated,
+				node_repeated, explored, memo_info, timeTook)
+	return actions
 
 
 #-----------------
 # Run Program
 #-----------------
 if __name__ == '__main__':
-	name = "./Testcases/{}.txt".format(1)
-	walls, goals, boxes, paths, player, _, _ = set_value(name)
-	distanceToGoal, dead_squares = set_distance()
+	name = solver.level_collection().name(0)
+	walls, goals, boxes, paths, player, _, _, puzzle = load_level_number(0)
 	
 	while True:
-		clock.tick(FPS)
+		elapsed = clock.tick(FPS)
 		if is_win(goals, boxes) == True and mode == 1:
 			win = 1
 			if history == 0:
@@ -576,73 +606,80 @@ if __name__ == '__main__':
 		if step == 3 and win == 0 and mode == 1:
 			timeTook = time.time() - startTime
 
-		if step == 3 and mode == 2 and win == 0:
-			(node_created, steps, times, memo, moves) = bfsg(player, boxes)
+		if step == 3 and mode > 1 and win == 0 and solving is None and not solve_failed:
+			start_solve(ALGORITHMS.get(mode, "BFSG"))
 
-		if len(moves) > 0 and visualized == 1:
-			(_, is_pushed, player, boxes) = move(player, boxes, moves[0][0])
-			actions.append(moves[0])
-			moves.pop(0)
-			stepNode += 1
-			pushed += is_pushed
-			ptr += 1
-			time.sleep(0.3)
-			
+		if solving is not None and solving.done:
+			actions = finish_solve(ALGORITHMS.get(mode, "BFSG"))
+
+		advance_playback(elapsed)
 
 		for event in pygame.event.get():
 			keys_pressed = pygame.key.get_pressed()
 			if event.type == pygame.QUIT or keys_pressed[pygame.K_q]:
 				pygame.quit()
 
+			if event.type == pygame.WINDOWEXPOSED:
+				redraw_all()
+
 			if event.type == pygame.KEYDOWN:
 				if step == 3:
 					if mode == 1 and win == 0:
 						if event.key == pygame.K_w or event.key == pygame.K_UP:
-							if U in set_available_moves(player, boxes):
+							if U in puzzle.available_moves(player, boxes):
 								if ptr + 1 < len(actions):
 									actions = actions[0:(ptr+1)]
-								(_, is_pushed, player, boxes) = move(player, boxes, U)
+								(_, is_pushed, player, boxes) = puzzle.move(player, boxes, U)
 								stepNode += 1
 								pushed += is_pushed
 								ptr += 1
 								actions.append((U, is_pushed))
 						elif event.key == pygame.K_s or event.key == pygame.K_DOWN:
-							if D in set_available_moves(player, boxes):
+							if D in puzzle.available_moves(player, boxes):
 								if ptr + 1 < len(actions):
 									actions = actions[0:(ptr+1)]
-								(_, is_pushed, player, boxes) = move(player, boxes, D)
+								(_, is_pushed, player, boxes) = puzzle.move(player, boxes, D)
 								stepNode += 1
 								pushed += is_pushed
 								ptr += 1
 								actions.append((D, is_pushed))
 						elif event.key == pygame.K_a or event.key == pygame.K_LEFT:
-							if L in set_available_moves(player, boxes):
+							if L in puzzle.available_moves(player, boxes):
 								if ptr + 1 < len(actions):
 									actions = actions[0:(ptr+1)]
-								(_, is_pushed, player, boxes) = move(player, boxes, L)
+								(_, is_pushed, player, boxes) = puzzle.move(player, boxes, L)
 								stepNode += 1
 								pushed += is_pushed
 								ptr += 1
 								actions.append((L, is_pushed))
 						elif event.key == pygame.K_d or event.key == pygame.K_RIGHT:
-							if R in set_available_moves(player, boxes):
+							if R in puzzle.available_moves(player, boxes):
 								if ptr + 1 < len(actions):
 									actions = actions[0:(ptr+1)]
-								(_, is_pushed, player, boxes) = move(player, boxes, R)
+								(_, is_pushed, player, boxes) = puzzle.move(player, boxes, R)
 								stepNode += 1
 								pushed += is_pushed
 								ptr += 1
 								actions.append((R, is_pushed))
+					elif mode > 1 and win == 1:
+						visualized = 1
+						playback_key(event.key)
+				elif step == 1:
+					# Paging through large packs; the arrows on screen step by one
+					jump = {pygame.K_UP: 1, pygame.K_DOWN: -1, pygame.K_PAGEUP: 100, pygame.K_PAGEDOWN: -100}.get(event.key)
+					if jump is not None:
+						level = (level + jump)%len(solver.level_collection())
+						reset_data()
 
 			if event.type == pygame.MOUSEBUTTONDOWN:
 				x, y = event.pos
 
 				if step == 1:
 					if up_arrow_rect.collidepoint(x, y):
-						level = (level + 1)%40
+						level = (level + 1)%len(solver.level_collection())
 						reset_data()
 					if down_arrow_rect.collidepoint(x,y):
-						level = (level+39)%40
+						level = (level - 1)%len(solver.level_collection())
 						reset_data()
 					if pick_rect.collidepoint(x,y):
 						step = 2
@@ -660,6 +697,10 @@ if __name__ == '__main__':
 						mode = 3
 						step = 3
 						continue
+					if ida_rect.collidepoint(x,y):
+						mode = 4
+						step = 3
+						continue
 
 				if step == 3:
 					if mode == 1:
@@ -678,12 +719,15 @@ if __name__ == '__main__':
 							if visualized == 0:
 								if visualize_rect.collidepoint(x,y):
 									visualized = 1
+									toggle_playback()
 							else:
 								if undo_rect.collidepoint(x,y):
+									playing = False
 									undo()
 								if redo_rect.collidepoint(x,y):
+									playing = False
 									redo()
-					if mode == 3:
+					if mode == 3 or mode == 4:
 						if restart_rect.collidepoint(x,y):
 							init_data()
 							step = 1
@@ -691,11 +735,13 @@ if __name__ == '__main__':
 							if visualized == 0:
 								if visualize_rect.collidepoint(x,y):
 									visualized = 1
+									toggle_playback()
 							else:
 								if undo_rect.collidepoint(x,y):
+									playing = False
 									undo()
 								if redo_rect.collidepoint(x,y):
+									playing = False
 									redo()
 
-		draw_board()
-		pygame.display.update()
\ No newline at end of file
+		draw_board()
\ No newline at end of file
@@ -0,0 +1,89 @@
+import json
+import time
+import tracemalloc
+
+
+#------------------------
+# Solve Metrics
+#------------------------
+class SolveMetrics:
+	"""Measurements of one solve. Timings are perf_counter_ns() nanoseconds, split
+	into setup (loading the level and building the board) and the search itself;
+	`peak_bytes` is the tracemalloc peak during the search, None when it wasn't
+	traced. Written as one JSON object per line by write_jsonl()."""
+
+	def __init__(self, algorithm, engine=None, level=None):
+		self.level = level
+		self.algorithm = algorithm
+		self.engine = engine
+		self.solved = False
+		self.steps = 0
+		self.nodes = 0
+		self.setup_ns = 0
+		self.search_ns = 0
+		self.peak_bytes = None
+		self.peak_frontier = 0
+		self.explored = 0
+		self.heuristic_calls = 0
+		self.heuristic_hits = 0
+		self.heuristic_ns = 0
+		self.pruned = None
+		self.dropped = None
+		self.cached = False
+		self.resumed = False
+		self.started = None
+
+	@property
+	def search_time(self):
+		return self.search_ns / 1e9
+
+	@property
+	def peak_mb(self):
+		return None if self.peak_bytes is None else self.peak_bytes / (1024 * 1024)
+
+	@property
+	def nodes_per_sec(self):
+		return self.nodes * 1e9 / self.search_ns if self.search_ns else 0.0
+
+	def start(self, trace_memory=True):
+		"""Call right before the search starts."""
+		if trace_memory:
+			tracemalloc.start()
+			tracemalloc.reset_peak()
+		self.started = time.perf_counter_ns()
+
+	def stop(self, nodes, steps, frontier, explored, heuristic, deadlock=None):
+		"""Call right after the search returns; `steps` is None if it failed.
+		`explored` is the number of explored states."""
+		self.search_ns = time.perf_counter_ns() - self.started
+		if tracemalloc.is_tracing():
+			self.peak_bytes = tracemalloc.get_traced_memory()[1]
+			tracemalloc.stop()
+		self.solved = steps is not None
+		self.steps = steps or 0
+		self.nodes = nodes
+		self.peak_frontier = frontier.peak
+		self.explored = explored
+		self.heuristic_calls = heuristic.calls
+		self.heuristic_hits = heuristic.hits
+		self.heuristic_ns = heuristic.time_ns
+		if deadlock is not None:
+			self.pruned = dict(deadlock.pruned)
+
+	def restore(self, fields):
+		"""Takes the measurements of an earlier solve of the same level, as
+		written by as_dict(), keeping this solve's level and setup time."""
+		for key, value in (fields or {}).items():
+			if key not in ("level", "setup_ns", "nodes_per_sec"):
+				setattr(self, key, value)
+		self.cached = True
+
+	def as_dict(self):
+		fields = {key: value for key, value in vars(self).items() if key != "started"}
+		fields["nodes_per_sec"] = self.nodes_per_sec
+		return fields
+
+
+def write_jsonl(filename, metrics):
+	with open(filename, 'a+') as f:
+		f.write(json.dumps(metrics.as_dict()) + "\n")
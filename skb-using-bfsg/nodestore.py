@@ -0,0 +1,36 @@
+from array import array
+
+
+#------------------------
+# Node Store
+#------------------------
+class NodeStore:
+	"""Search tree kept in two flat arrays instead of a copied action list per
+	frontier entry: parent[i] is the index of node i's parent (-1 for the
+	root) and code[i] packs the move into node i as direction << 1 | is_pushed.
+	The solution is rebuilt once by walking the parents back from the goal."""
+
+	def __init__(self):
+		self.parent = array('q')
+		self.code = array('B')
+
+	def __len__(self):
+		return len(self.parent)
+
+	def add(self, parent, direction=0, is_pushed=0):
+		self.parent.append(parent)
+		self.code.append(direction << 1 | is_pushed)
+		return len(self.parent) - 1
+
+	def path(self, node):
+		"""Moves from the root to `node` as a list of (direction index, is_pushed)."""
+		actions = []
+		while self.parent[node] >= 0:
+			code = self.code[node]
+			actions.append((code >> 1, code & 1))
+			node = self.parent[node]
+		actions.reverse()
+		return actions
+
+	def nbytes(self):
+		return self.parent.itemsize * len(self.parent) + self.code.itemsize * len(self.code)
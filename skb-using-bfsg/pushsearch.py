@@ -0,0 +1,135 @@
+from array import array
+from collections import deque
+from bitboard import iter_bits
+from nodestore import NodeStore
+
+
+#------------------------
+# Player Reachability
+#------------------------
+def reachable(board, player, boxes):
+	"""Mask of the cells the player can walk to from `player` without pushing."""
+	neighbors = board.neighbors
+	bit = board.bit
+	seen = bit[player]
+	stack = [player]
+	while stack:
+		cell = stack.pop()
+		for target in neighbors[cell]:
+			if target >= 0 and not (seen | boxes) & bit[target]:
+				seen |= bit[target]
+				stack.append(target)
+	return seen
+
+def normalize(region):
+	# The smallest reachable cell stands for the whole player region
+	return (region & -region).bit_length() - 1
+
+def pushes(board, boxes, region):
+	"""Legal pushes (box cell, direction) from a player region, dead squares excluded."""
+	neighbors = board.neighbors
+	bit = board.bit
+	blocked = boxes | board.dead
+	for cell in iter_bits(region):
+		for d, target in enumerate(neighbors[cell]):
+			if target >= 0 and boxes & bit[target]:
+				beyond = neighbors[target][d]
+				if beyond >= 0 and not blocked & bit[beyond]:
+					yield target, d
+
+def walk(board, start, target, boxes):
+	"""Shortest list of directions that walks the player from start to target."""
+	parent = {start: None}
+	queue = deque([start])
+	while queue:
+		cell = queue.popleft()
+		if cell == target:
+			break
+		for d, next_cell in enumerate(board.neighbors[cell]):
+			if next_cell >= 0 and next_cell not in parent and not boxes & board.bit[next_cell]:
+				parent[next_cell] = (cell, d)
+				queue.append(next_cell)
+	path = []
+	while parent[target] is not None:
+		target, d = parent[target]
+		path.append(d)
+	path.reverse()
+	return path
+
+
+#------------------------
+# Solution Reconstruction
+#------------------------
+class PushStore(NodeStore):
+	"""NodeStore whose moves are pushes; it also keeps the cell of the box each
+	push moved."""
+
+	def __init__(self):
+		super().__init__()
+		self.box = array('q')
+
+	def add(self, parent, direction=0, box=-1):
+		self.box.append(box)
+		return super().add(parent, direction, int(box >= 0))
+
+	def pushes(self, node):
+		"""Pushes from the root to `node` as a list of (box cell, direction)."""
+		chain = []
+		while self.parent[node] >= 0:
+			chain.append((self.box[node], self.code[node] >> 1))
+			node = self.parent[node]
+		chain.reverse()
+		return chain
+
+def rebuild_solution(board, chain, player, boxes):
+	"""Turns a chain of pushes back into single player moves, as a list of
+	(direction index, is_pushed)."""
+	actions = []
+	for box, d in chain:
+		behind = board.neighbors[box][(d + 2) % 4]
+		actions += [(step, 0) for step in walk(board, player, behind, boxes)]
+		actions.append((d, 1))
+		boxes ^= board.bit[box] | board.bit[board.neighbors[box][d]]
+		player = box
+	return actions
+
+
+#-----------------
+# Search
+#-----------------
+def bfsg(board, heuristic, frontier, explored, curr_player, curr_boxes):
+	"""Greedy best-first search where a node is a box configuration plus the
+	normalized player region and the successors are the legal pushes.
+
+	Same arguments and return value as bitboard.bfsg(); node counts are pushes,
+	while actions is still move-by-move."""
+	player = board.index[curr_player]
+	boxes = board.encode(curr_boxes)
+	zobrist = board.zobrist
+	start = normalize(reachable(board, player, boxes))
+	h = zobrist.hash(start, iter_bits(boxes))
+	node_repeated = 0
+	node_generated = 1
+	explored.add(h, start, boxes)
+	nodes = PushStore()
+	frontier.push(heuristic(boxes), (start, boxes, h, 0, nodes.add(-1)))
+	while frontier:
+		(now_player, now_boxes, h, push, node) = frontier.pop()
+		heuristic.parent = now_boxes
+		for box, d in pushes(board, now_boxes, reachable(board, now_player, now_boxes)):
+			beyond = board.neighbors[box][d]
+			new_boxes = now_boxes ^ (board.bit[box] | board.bit[beyond])
+			if board.deadlock is not None and board.deadlock.is_deadlock(new_boxes, beyond):
+				node_generated += 1
+				continue
+			new_player = normalize(reachable(board, box, new_boxes))
+			new_h = zobrist.shift_box(zobrist.move(h, now_player, new_player), box, beyond)
+			if explored.add(new_h, new_player, new_boxes):
+				child = nodes.add(node, d, box)
+				if board.is_win(new_boxes):
+					return node_generated + 1, node_repeated, len(explored), rebuild_solution(board, nodes.pushes(child), player, boxes)
+				frontier.push(heuristic(new_boxes), (new_player, new_boxes, new_h, push + 1, child), push + 1)
+			else:
+				node_repeated += 1
+			node_generated += 1
+	return node_generated, node_repeated, len(explored), None
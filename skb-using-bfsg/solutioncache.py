@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+from bitboard import CHARS
+from zobrist import canonical
+
+
+#------------------------
+# Solution Cache
+#------------------------
+# Solutions found by solver.solve(), appended one JSON object per line to
+# SOLUTIONS and read back into a dict on first use. An entry is keyed by the
+# level (walls, goals and floor, so formatting of the file doesn't matter), the
+# start state and the search configuration, and is only used when it was stored
+# by the same solver version and its moves replay to a win.
+SOLUTIONS = os.path.join("Cache", "solutions.jsonl")
+
+
+def encode_moves(solution):
+	"""LURD notation: a letter per move, upper case for a push."""
+	return "".join(CHARS[d] if pushed else CHARS[d].lower() for d, pushed in solution)
+
+def decode_moves(moves):
+	return [(CHARS.index(char.upper()), int(char.isupper())) for char in moves]
+
+def replay(board, player, boxes, solution):
+	"""Whether the moves are legal from the start, push exactly where they say
+	they do, and solve the level."""
+	player = board.index[player]
+	boxes = board.encode(boxes)
+	for d, pushed in solution:
+		if d not in board.available_moves(player, boxes):
+			return False
+		_, is_pushed, player, boxes = board.move(player, boxes, d)
+		if is_pushed != pushed:
+			return False
+	return board.is_win(boxes)
+
+
+class SolutionCache:
+
+	def __init__(self, version, filename=SOLUTIONS):
+		self.version = version
+		self.filename = filename
+		self.entries = None
+
+	def load(self):
+		self.entries = dict()
+		if not os.path.exists(self.filename):
+			return
+		with open(self.filename, 'r') as f:
+			for line in f:
+				try:
+					entry = json.loads(line)
+				except ValueError: # a line cut short by a crash
+					continue
+				if entry.get("version") == self.version:
+					self.entries[entry["key"]] = entry
+
+	def key(self, puzzle, player, boxes, config):
+		level = getattr(puzzle, "level_hash", None)
+		if level is None:
+			level = hashlib.sha1(repr((sorted(puzzle.walls), sorted(puzzle.goals), sorted(puzzle.paths))).encode()).hexdigest()
+			puzzle.level_hash = level
+		return "{}:{}:{}".format(level, repr((player, canonical(boxes))), repr(config))
+
+	def get(self, puzzle, player, boxes, config):
+		"""The stored entry with its moves decoded into `solution`, or None."""
+		if self.entries is None:
+			self.load()
+		key = self.key(puzzle, player, boxes, config)
+		entry = self.entries.get(key)
+		if entry is None:
+			return None
+		if "solution" not in entry:
+			solution = decode_moves(entry["moves"])
+			if not replay(puzzle.board, player, boxes, solution):
+				del self.entries[key]
+				return None
+			entry["solution"] = solution
+		return entry
+
+	def put(self, puzzle, player, boxes, config, solution, node_generated, node_repeated, explored, metrics=None):
+		if self.entries is None:
+			self.load()
+		entry = {
+			"key": self.key(puzzle, player, boxes, config),
+			"version": self.version,
+			"moves": encode_moves(solution),
+			"node_generated": node_generated,
+			"node_repeated": node_repeated,
+			"explored": explored,
+			"metrics": None if metrics is None else metrics.as_dict(),
+		}
+		os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+		# One write per line, so workers appending at the same time don't interleave
+		with open(self.filename, 'a') as f:
+			f.write(json.dumps(entry) + "\n")
+		entry["solution"] = solution
+		self.entries[entry["key"]] = entry
@@ -0,0 +1,406 @@
+import time
+from bitboard import Board, bfsg as bitboard_bfsg
+from pushsearch import bfsg as push_bfsg
+from bidirectional import bfsg as bidirectional_bfsg
+import batchsearch
+from batchsearch import bfsg as batch_bfsg
+from astar import astar, idastar
+from heuristic import Heuristic, Cancelled
+from gridanalysis import analyse
+from frontier import make_frontier, BlockFrontier
+from nodestore import NodeStore
+from zobrist import ZobristTable, canonical, push_box
+from explored import make_explored
+from deadlock import DeadlockDetector, RULES
+from solutioncache import SolutionCache
+from levelpack import open_levels
+from checkpoint import Checkpoint
+from budget import MemoryBudget
+
+
+#------------------------
+# Headless Solver
+#------------------------
+# Level parsing, analysis, moves and search shared by the GUI (main.py) and the
+# benchmarks (test_BFSG.py, benchmark.py). Only imports the standard library,
+# NumPy and the search modules, so worker processes start without pygame or pandas.
+
+# State engine used by the BFSG algorithm: "tuple" (coordinate tuples and sets),
+# "bitboard", "push" (bitboard states, one node per box push), "bidirectional"
+# (push states searched from the start and pulled back from the goals) or
+# "batch" (bitboard states expanded and scored a batch at a time on NumPy arrays)
+ENGINE = "tuple"
+SEARCH_ENGINES = {"bitboard": bitboard_bfsg, "push": push_bfsg, "bidirectional": bidirectional_bfsg,
+				  "batch": batch_bfsg}
+# Optimal searches, by the name written to the results
+ALGORITHMS = {"A*": astar, "IDA*": idastar}
+# Frontier used by every engine: "bucket" or "heap", with ties broken "fifo", "lifo" or "pushes"
+FRONTIER = "bucket"
+TIE_BREAK = "fifo"
+# Explored states: "set" (Python set) or "table" (open-addressing table of 64-bit
+# hashes); EXPLORED_EXACT also stores each packed state and compares it on a hash match
+EXPLORED = "set"
+EXPLORED_EXACT = False
+EXPLORED_MAX_BYTES = 1 << 30
+# Dynamic deadlock rules checked on every push, () to switch them off
+DEADLOCKS = RULES
+# The tuple engine also tracks the old tuple(set(boxes)) keys and counts the
+# duplicates they miss in Puzzle.missed
+COUNT_MISSED = False
+# Load levels through levelcache.py, which keeps each level's parsed grid and
+# analysis on disk. Pays off on large levels; the testcases here analyse as fast
+# as they load
+LEVEL_CACHE = False
+# Levels of the GUI and the benchmarks: a directory of 1.txt, 2.txt, ... or a
+# pack file of any number of levels in XSB or the custom notation (levelpack.py)
+LEVELS = "./Testcases"
+levels = None
+# Look solutions up in the solution cache before searching, and store new ones
+SOLUTION_CACHE = True
+# Snapshot BFSG searches on the "tuple" and "bitboard" engines every
+# CHECKPOINT_INTERVAL seconds (checkpoint.py), and resume a search from the
+# snapshot of its level, so one killed partway through loses at most that much
+CHECKPOINT = False
+CHECKPOINT_INTERVAL = 60
+# Byte budget of a BFSG search on the "tuple" and "bitboard" engines, None for no
+# limit. Over it the worst frontier entries are dropped (budget.py), so a search
+# stays within it at the price of maybe missing the solution, and MemoryError is
+# raised once the explored states alone fill it. Also caps the explored table of
+# every search at half the budget
+MEMORY_BUDGET = None
+# Cached solutions from other versions are ignored. Bump it whenever a change
+# to the searches changes the solutions or node counts they give
+SOLVER_VERSION = 1
+
+solutions = SolutionCache(SOLVER_VERSION)
+
+
+class Direction:
+	def __init__(self, vector, char):
+		self.vector = vector
+		self.char = char
+
+	def get_char(self):
+		return self.char
+
+L = Direction((-1, 0), 'L')
+R = Direction((1, 0), 'R')
+U = Direction((0, -1), 'U')
+D = Direction((0, 1), 'D')
+directions = [U, L, D, R] # clock-wise
+direction_index = {direction: i for i, direction in enumerate(directions)}
+
+
+#-----------------
+# Levels
+#-----------------
+def set_value(filename):
+	with open(filename, 'r') as f:
+		return parse_level(f.read())
+
+def parse_level(read_data):
+	"""Walls, goals, boxes, paths, player, x, y of a level in the custom
+	notation (levelpack.to_custom() turns XSB into it)."""
+	walls = set() # set of Point()
+	goals = set()
+	boxes = []
+	paths = set()
+	player = None
+	x = 0
+	y = 0
+	lines = read_data.split('\n')
+	for line in lines:
+		x = 0
+		for char in line:
+			if char == '#': # Wall
+				walls.add((x,y))
+			elif char == 'x': # Box
+				boxes.append((x,y))
+				paths.add((x,y))
+			elif char == '?': # Goal
+				goals.add((x,y))
+				paths.add((x,y))
+			elif char == '@': # Player
+				player = (x,y)
+				paths.add((x,y))
+			elif char == '-': # Player and Goal
+				goals.add((x,y))
+				player = (x,y)
+				paths.add((x,y))
+			elif char == '+': # Box and Goal
+				goals.add((x,y))
+				boxes.append((x,y))
+				paths.add((x,y))
+			elif char == '.': # Path - avaiable move
+				paths.add((x,y))
+			x += 1
+		y += 1
+	return walls, goals, tuple(boxes), paths, player, x, y
+
+def is_win(goals, boxes):
+	return goals.issubset(boxes)
+
+
+class Puzzle:
+	"""A parsed level with its push distances, dead squares, bitboard and
+	deadlock detector; positions are (x, y) tuples and boxes canonical tuples.
+	`distance` and `dead` are gridanalysis.analyse()'s arrays over board.cells,
+	`analysis` is that result when it is already known."""
+
+	def __init__(self, walls, goals, paths, analysis=None):
+		self.walls = walls
+		self.goals = goals
+		self.paths = paths
+		self.board = Board(goals, paths)
+		self.distance, self.dead = analysis if analysis is not None else analyse(walls, goals, self.board.cells)
+		self.dead_squares = {cell for cell, dead in zip(self.board.cells, self.dead.tolist()) if dead}
+		self.board.dead = self.board.encode(self.dead_squares)
+		self.deadlock = DeadlockDetector(self.board, DEADLOCKS) if DEADLOCKS else None
+		self.board.deadlock = self.deadlock
+		self.missed = 0
+
+	def available_moves(self, player, boxes):
+		walls = self.walls
+		available_moves = []
+		for direction in directions:
+			if (player[0] + direction.vector[0], player[1] + direction.vector[1]) not in walls:
+				if (player[0] + direction.vector[0], player[1] + direction.vector[1]) in boxes:
+					if ((player[0] + 2*direction.vector[0], player[1] + 2*direction.vector[1]) not in walls) and ((player[0] + 2*direction.vector[0], player[1] + 2*direction.vector[1]) not in boxes):
+						available_moves.append(direction)
+				else:
+					available_moves.append(direction)
+		return available_moves
+
+	def move(self, player, boxes, direction):
+		"""Returns (res, is_pushed, player, boxes); res is False when the push
+		leaves a box on a dead square or in a deadlock."""
+		temp = (player[0] + direction.vector[0], player[1] + direction.vector[1])
+		is_pushed = 0
+		res = True
+		if temp in boxes:
+			is_pushed = 1
+			box_to = (player[0] + 2*direction.vector[0], player[1] + 2*direction.vector[1])
+			boxes = push_box(boxes, temp, box_to)
+			if box_to in self.dead_squares:
+				res = False
+			elif self.deadlock is not None and self.deadlock.is_deadlock_points(boxes, box_to):
+				res = False
+		player = temp
+		return res, is_pushed, player, boxes
+
+
+def load_level(filename):
+	"""set_value() plus the level's Puzzle: walls, goals, boxes, paths, player,
+	x, y, puzzle."""
+	with open(filename, 'r') as f:
+		return load_level_text(f.read())
+
+def load_level_text(text):
+	if LEVEL_CACHE:
+		from levelcache import load_text as load_compiled
+		walls, goals, boxes, paths, player, x, y, distance, dead = load_compiled(text)
+		return walls, goals, boxes, paths, player, x, y, Puzzle(walls, goals, paths, (distance, dead))
+	walls, goals, boxes, paths, player, x, y = parse_level(text)
+	return walls, goals, boxes, paths, player, x, y, Puzzle(walls, goals, paths)
+
+def level_collection():
+	"""The LEVELS collection, opened on the first call."""
+	global levels
+	if levels is None or levels.path != LEVELS:
+		levels = open_levels(LEVELS)
+	return levels
+
+def load_level_number(n):
+	"""load_level() for level n (from 0) of LEVELS."""
+	return load_level_text(level_collection().text(n))
+
+
+def legacy_move(boxes, player, direction):
+	# Boxes tuple as the old move() built it, kept only to count missed duplicates
+	temp = (player[0] + direction.vector[0], player[1] + direction.vector[1])
+	boxes = set(boxes)
+	if temp in boxes:
+		boxes.remove(temp)
+		boxes.add((player[0] + 2*direction.vector[0], player[1] + 2*direction.vector[1]))
+	return tuple(boxes)
+
+
+#-----------------
+# Search
+#-----------------
+def explored_for(board, pack):
+	max_bytes = EXPLORED_MAX_BYTES
+	if MEMORY_BUDGET is not None:
+		# A growing table holds its old arrays next to the new, twice as large ones
+		max_bytes = min(max_bytes, MEMORY_BUDGET // 2)
+	return make_explored(EXPLORED, pack if EXPLORED_EXACT else None, board.state_bits, max_bytes)
+
+def tuple_bfsg(puzzle, heuristic, frontier, explored, curr_player, curr_boxes, checkpoint=None, budget=None):
+	"""The original greedy search on coordinate tuples, with the arguments and
+	return value of bitboard.bfsg() but a Puzzle instead of a Board."""
+	zobrist = ZobristTable(puzzle.paths)
+	if checkpoint is not None and checkpoint.search is not None:
+		node_generated, node_repeated, nodes, legacy_explored = checkpoint.search
+	else:
+		node_repeated = 0
+		node_generated = 0
+		curr_boxes = canonical(curr_boxes)
+		h = zobrist.hash(curr_player, curr_boxes)
+		legacy_explored = set()
+		nodes = NodeStore()
+		frontier.push(heuristic(curr_boxes), (curr_player, curr_boxes, h, 0, 0, nodes.add(-1), curr_boxes))
+		node_generated += 1
+		explored.add(h, curr_player, curr_boxes)
+	while len(frontier) > 0:
+		if checkpoint is not None and checkpoint.due():
+			checkpoint.save(frontier, explored, (node_generated, node_repeated, nodes, legacy_explored))
+		if budget is not None:
+			budget.enforce(frontier, explored, nodes)
+		(now_player, now_boxes, h, steps, push, node, legacy_boxes) = frontier.pop()
+		heuristic.parent = now_boxes
+		for m in puzzle.available_moves(now_player, now_boxes):
+			res, is_pushed, new_player, new_boxes = puzzle.move(now_player, now_boxes, m)
+			if is_pushed:
+				new_h = zobrist.move(h, now_player, new_player, (new_player[0] + m.vector[0], new_player[1] + m.vector[1]))
+			else:
+				new_h = zobrist.move(h, now_player, new_player)
+			is_new = res == True and explored.add(new_h, new_player, new_boxes)
+			if COUNT_MISSED:
+				new_legacy = legacy_move(legacy_boxes, now_player, m)
+				if res == True and not is_new and (new_player, new_legacy) not in legacy_explored:
+					puzzle.missed += 1
+				legacy_explored.add((new_player, new_legacy))
+			else:
+				new_legacy = None
+			if is_new:
+				child = nodes.add(node, direction_index[m], is_pushed)
+				if is_win(puzzle.goals, new_boxes):
+					return node_generated + 1, node_repeated, len(explored), nodes.path(child)
+				frontier.push(heuristic(new_boxes), (new_player, new_boxes, new_h, steps + 1, push + is_pushed, child, new_legacy), push + is_pushed)
+			else:
+				node_repeated += 1
+			node_generated += 1
+	return node_generated, node_repeated, len(explored), None
+
+class SearchMonitor:
+	"""Follows a solve() running in another thread through the heuristic and
+	frontier it searches with, and cancels it by making the heuristic raise
+	Cancelled."""
+
+	def __init__(self):
+		self.heuristic = None
+		self.frontier = None
+		self.started = None
+		self.cancelled = False
+		self.done = False
+		self.result = None
+		self.error = None # the exception the search raised, other than Cancelled
+
+	def attach(self, heuristic, frontier):
+		heuristic.cancelled = self.cancelled
+		self.heuristic = heuristic
+		self.frontier = frontier
+		self.started = time.perf_counter()
+
+	def cancel(self):
+		self.cancelled = True
+		if self.heuristic is not None:
+			self.heuristic.cancelled = True
+
+	@property
+	def nodes(self):
+		"""Nodes evaluated so far, one heuristic call each."""
+		return 0 if self.heuristic is None else self.heuristic.calls
+
+	@property
+	def nodes_per_sec(self):
+		elapsed = time.perf_counter() - self.started if self.started is not None else 0
+		return self.nodes / elapsed if elapsed else 0.0
+
+	@property
+	def frontier_size(self):
+		return 0 if self.frontier is None else len(self.frontier)
+
+
+def search_config(algorithm, trace_memory):
+	"""Every setting that changes what a search returns or measures, as part of
+	the key of its cached solutions and checkpoints."""
+	engine = None if algorithm in ALGORITHMS else ENGINE
+	config = (algorithm, engine, FRONTIER, TIE_BREAK, tuple(DEADLOCKS), EXPLORED, EXPLORED_EXACT, MEMORY_BUDGET, trace_memory)
+	if engine == "batch":
+		config += (batchsearch.BATCH_SIZE, batchsearch.SEED)
+	return config
+
+def solve(puzzle, curr_player, curr_boxes, algorithm="BFSG", metrics=None, trace_memory=False, monitor=None):
+	"""Runs `algorithm`, "BFSG" on ENGINE or one of ALGORITHMS, from the given
+	start. Returns (node_generated, node_repeated, explored, actions) with actions
+	a list of (Direction, is_pushed), or None if there is no solution.
+
+	A metrics.SolveMetrics passed in gets the setup time of the search added and
+	is started and stopped around the search itself. With SOLUTION_CACHE a
+	cached solution is returned with the counts and metrics of the search that
+	found it, and `metrics.cached` set. With CHECKPOINT a search resumed from
+	a snapshot sets `metrics.resumed`, and its timings cover this run only.
+	With MEMORY_BUDGET `metrics.dropped` counts the frontier entries the budget
+	dropped; a search that dropped any may return None on a solvable level. A
+	SearchMonitor is attached to the search, which raises Cancelled if the
+	monitor is cancelled."""
+	config = search_config(algorithm, trace_memory)
+	if SOLUTION_CACHE:
+		entry = solutions.get(puzzle, curr_player, curr_boxes, config)
+		if entry is not None:
+			if metrics is not None:
+				metrics.restore(entry["metrics"])
+				metrics.solved = True
+				metrics.steps = len(entry["solution"])
+				metrics.nodes = entry["node_generated"]
+				metrics.explored = entry["explored"]
+			return entry["node_generated"], entry["node_repeated"], entry["explored"], [(directions[d], is_pushed) for d, is_pushed in entry["solution"]]
+	setup = time.perf_counter_ns()
+	board = puzzle.board
+	search = ALGORITHMS.get(algorithm) or SEARCH_ENGINES.get(ENGINE)
+	frontier = make_frontier(FRONTIER, TIE_BREAK)
+	if search is batch_bfsg:
+		frontier = BlockFrontier(frontier)
+	if search is None:
+		heuristic = Heuristic(puzzle.distance, board.cells)
+		explored = explored_for(board, board.pack_points)
+	else:
+		heuristic = Heuristic(puzzle.distance, board.cells, board)
+		explored = explored_for(board, board.pack)
+	checkpoint = None
+	if CHECKPOINT and algorithm not in ALGORITHMS and search in (None, bitboard_bfsg):
+		key = solutions.key(puzzle, curr_player, curr_boxes, config + (SOLVER_VERSION,))
+		checkpoint = Checkpoint(key, CHECKPOINT_INTERVAL)
+		snapshot = checkpoint.load()
+		if snapshot is not None:
+			frontier = snapshot[0]
+			explored.restore(snapshot[1])
+			if metrics is not None:
+				metrics.resumed = True
+	budget = None
+	if MEMORY_BUDGET is not None and algorithm not in ALGORITHMS and search in (None, bitboard_bfsg):
+		budget = MemoryBudget(MEMORY_BUDGET, heuristic)
+	if monitor is not None:
+		monitor.attach(heuristic, frontier)
+	if metrics is not None:
+		metrics.setup_ns += time.perf_counter_ns() - setup
+		metrics.start(trace_memory)
+	if search is None:
+		result = tuple_bfsg(puzzle, heuristic, frontier, explored, curr_player, curr_boxes, checkpoint, budget)
+	elif checkpoint is not None or budget is not None:
+		result = search(board, heuristic, frontier, explored, curr_player, curr_boxes, checkpoint, budget)
+	else:
+		result = search(board, heuristic, frontier, explored, curr_player, curr_boxes)
+	if checkpoint is not None:
+		checkpoint.clear()
+	node_generated, node_repeated, explored_count, solution = result
+	if metrics is not None:
+		metrics.stop(node_generated, None if solution is None else len(solution), frontier, explored_count, heuristic, puzzle.deadlock)
+		if budget is not None:
+			metrics.dropped = budget.dropped
+	if solution is None:
+		return node_generated, node_repeated, explored_count, None
+	if SOLUTION_CACHE:
+		solutions.put(puzzle, curr_player, curr_boxes, config, solution, node_generated, node_repeated, explored_count, metrics)
+	return node_generated, node_repeated, explored_count, [(directions[d], is_pushed) for d, is_pushed in solution]
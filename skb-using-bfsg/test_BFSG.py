@@ -1,170 +1,84 @@
 import time
 import os
-import psutil
-from queue import Queue
-from copy import copy, deepcopy
-from datetime import datetime
-import math
-from sortedcontainers import SortedList
-import numpy as np
-from scipy.optimize import linear_sum_assignment
-import pandas as pd
+import signal
+try:
+	import resource
+except ImportError: # not on Windows, where levels run without a memory limit
+	resource = None
+from multiprocessing import Pool
+import solver
+from solver import load_level_number
+from metrics import SolveMetrics, write_jsonl
+from budget import BudgetExceeded
+
+
+# Algorithm run and written to BFSG.csv: "BFSG" (with solver.ENGINE), "A*" or
+# "IDA*". Engine, frontier, explored set and deadlock rules are set in solver.py
+ALGORITHM = "BFSG"
+
+# Fill the Memory column from a second solve traced with tracemalloc. Tracing
+# slows the search several times over, so the timings always come from the
+# first, untraced solve; switch it off to skip the second one
+TRACE_MEMORY = True
+
+def bfsg(puzzle, curr_player, curr_boxes):
+	"""Returns the SolveMetrics of the solve and the duplicates missed by the
+	old keys (always 0 unless solver.COUNT_MISSED)."""
+	engine = None if ALGORITHM in solver.ALGORITHMS else solver.ENGINE
+	metrics = SolveMetrics(ALGORITHM, engine)
+	solver.solve(puzzle, curr_player, curr_boxes, ALGORITHM, metrics)
+	missed = puzzle.missed
+	if TRACE_MEMORY:
+		traced = SolveMetrics(ALGORITHM, engine)
+		solver.solve(puzzle, curr_player, curr_boxes, ALGORITHM, traced, True)
+		metrics.peak_bytes = traced.peak_bytes
+	return metrics, missed
+
+
+#-----------------
+# Benchmark Runner
+#-----------------
+# Every level is solved in a fresh worker process, so its memory is measured
+# from that process's own baseline and a runaway level can't slow the others.
+# A level over TIME_LIMIT seconds or MEMORY_LIMIT_MB of address space is recorded
+# without results. With solver.CHECKPOINT a level's search snapshots itself as it
+# goes, and solving the level again after it was killed picks up where it stopped.
+WORKERS = os.cpu_count()
+TIME_LIMIT = 300
+MEMORY_LIMIT_MB = 2048
+
+def on_time_limit(signum, frame):
+	raise TimeoutError
+
+def solve_level(j):
+	"""Solves level j+1 of solver.LEVELS in the calling worker. Returns (j, results
+	of bfsg()), or (j, message) if it hit a limit."""
+	setup = time.perf_counter_ns()
+	_, _, boxes, _, player, _, _, puzzle = load_level_number(j)
+	setup = time.perf_counter_ns() - setup
+	print("\nSolving testcase {}: ".format(j+1))
+	if resource is not None:
+		limit = MEMORY_LIMIT_MB * 1024 * 1024
+		resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+	if hasattr(signal, "setitimer"):
+		signal.signal(signal.SIGALRM, on_time_limit)
+		signal.setitimer(signal.ITIMER_REAL, TIME_LIMIT)
+	try:
+		metrics, missed = bfsg(puzzle, player, boxes)
+	except TimeoutError:
+		return j, "Time limit of {} s exceeded".format(TIME_LIMIT)
+	except BudgetExceeded:
+		return j, "Memory budget of {} bytes exceeded".format(solver.MEMORY_BUDGET)
+	except MemoryError as error:
+		return j, str(error) or "Memory limit of {} MB exceeded".format(MEMORY_LIMIT_MB)
+	finally:
+		if hasattr(signal, "setitimer"):
+			signal.setitimer(signal.ITIMER_REAL, 0)
+	metrics.level = j+1
+	metrics.setup_ns += setup
+	return j, (metrics, missed)
 
 
-	
-class Direction:
-	def __init__(self, vector, char):
-		self.vector = vector
-		self.char = char
-
-	def get_char(self):
-		return self.char
-
-L = Direction((-1, 0), 'L')
-R = Direction((1, 0), 'R')
-U = Direction((0, -1), 'U')
-D = Direction((0, 1), 'D')
-directions = [U, L, D, R]
-
-def set_distance():
-	distanceToGoal = dict()
-	dead_squares = set()
-	for goal in goals:
-		distanceToGoal[goal] = dict()
-		for path in paths:
-			distanceToGoal[goal][path] = 1e9
-	queue = Queue()
-	for goal in goals:
-		distanceToGoal[goal][goal] = 0
-		queue.put(goal)
-		while not queue.empty():
-			position = queue.get()
-			for direction in directions:
-				boxPosition = (position[0] + direction.vector[0], position[1] + direction.vector[1])
-				playerPosition = (position[0] + 2*direction.vector[0], position[1] + 2*direction.vector[1])
-				if boxPosition in paths:
-					if distanceToGoal[goal][boxPosition] == 1e9:
-						if (boxPosition not in walls) and (playerPosition not in walls):
-							distanceToGoal[goal][boxPosition] = distanceToGoal[goal][position] + 1
-							queue.put(boxPosition)
-	# Add dead squares
-	for path in paths:
-		ok = 1
-		for goal in goals:	
-			if distanceToGoal[goal][path] != 1e9:
-				ok = 0
-				break
-		if ok == 1:
-			dead_squares.add(path)
-	return distanceToGoal, dead_squares
-
-def minimum_cost(boxes):
-	temp = []
-	for goal in goals:
-		for box in boxes:
-			# Using Manhattan distance
-			temp.append(abs(goal[0] - box[0]) + abs(goal[1] - box[1]))
-
-	arr = np.array(temp)
-	cost = arr.reshape(len(goals), len(boxes))
-	row_ind, col_ind = linear_sum_assignment(cost)
-	return cost[row_ind, col_ind].sum()
-
-def set_available_moves(player, boxes):
-	available_moves = []
-	for direction in directions:
-		if (player[0] + direction.vector[0], player[1] + direction.vector[1]) not in walls:
-			if (player[0] + direction.vector[0], player[1] + direction.vector[1]) in boxes:
-				if ((player[0] + 2*direction.vector[0], player[1] + 2*direction.vector[1]) not in walls) and ((player[0] + 2*direction.vector[0], player[1] + 2*direction.vector[1]) not in boxes):
-					available_moves.append(direction)
-			else:
-				available_moves.append(direction)
-	return available_moves
-
-def move(player, boxes, direction):	
-	temp = (player[0] + direction.vector[0], player[1] + direction.vector[1])
-	res = True
-	boxes = set(boxes)
-	if temp in boxes:
-		boxes.remove(temp)
-		boxes.add((player[0] + 2*direction.vector[0], player[1] + 2*direction.vector[1]))
-		
-		if (player[0] + 2*direction.vector[0], player[1] + 2*direction.vector[1]) in dead_squares:
-			res = False
-	boxes = tuple(boxes) 
-	player = temp
-	return res, player, boxes
-
-def is_win(goals, boxes):
-	return goals.issubset(boxes)
-
-def set_value(filename):
-	walls = set() # set of Point()
-	goals = set()
-	boxes = []
-	paths = set()
-	player = None
-	x = 0
-	y = 0
-	with open(filename, 'r') as f:
-		read_data = f.read()
-		lines = read_data.split('\n')	
-		for line in lines:
-			x = 0
-			for char in line:
-				if char == '#': # Wall
-					walls.add((x,y))
-				elif char == 'x': # Box
-					boxes.append((x,y))
-					paths.add((x,y))
-				elif char == '?': # Goal
-					goals.add((x,y))
-					paths.add((x,y))
-				elif char == '@': # Player
-					player = (x,y)
-					paths.add((x,y))
-				elif char == '-': # Player and Goal
-					goals.add((x,y))
-					player = (x,y)
-					paths.add((x,y))
-				elif char == '+': # Box and Goal
-					goals.add((x,y))
-					boxes.append((x,y))
-					paths.add((x,y))
-				elif char == '.': # Path - avaiable move
-					paths.add((x,y))
-				x += 1
-			y += 1
-	return walls, goals, tuple(boxes), paths, player
-
-
-itemMemory = psutil.Process(os.getpid()).memory_info().rss/(1024*1024)
-
-
-def bfsg(curr_player, curr_boxes):
-	node_generated = 0
-	frontier = SortedList(key=lambda x: minimum_cost( x[1]))
-	explored = set()
-	frontier.add((curr_player, curr_boxes, 0, []))
-
-	node_generated += 1
-	explored.add((curr_player, curr_boxes))
-	startTime = time.time()
-	while True:
-		(now_player, now_boxes, step, actions) = frontier.pop(0)
-		moves = set_available_moves(now_player,now_boxes)
-		for m in moves:
-			res, new_player, new_boxes = move(now_player, now_boxes, m)
-			if (new_player, new_boxes) not in explored and res == True:
-				explored.add((new_player, new_boxes))
-				if is_win(goals, new_boxes):
-					end = time.time() - startTime
-					memo_info = psutil.Process(os.getpid()).memory_info().rss/(1024*1024) - itemMemory
-					return (node_generated + 1,step + 1, end, memo_info)
-				frontier.add((new_player, new_boxes, step+1, actions + [m]))
-			node_generated += 1
-	
-
 if __name__ == '__main__':
 	i = -1
 	if not os.path.exists("BFSG.csv"):
@@ -179,23 +93,37 @@ if __name__ == '__main__':
 		i = len(contents.split('\n')) - 2
 		f.close()
 	
+	count = len(solver.level_collection())
 	print("Loading BFS algorithm results from testcase {}".format(i+1))
 	sum_times = 0
 	sum_memo = 0
 
-	for j in range(i, 40):
-		walls, goals, boxes, paths, player = set_value("./Testcases/{}.txt".format(j%40+1))
-		distanceToGoal, dead_squares = set_distance()
-		print("\nSolving testcase {}: ".format(j+1))
-		(node_created, step, times, memo) = bfsg(player, boxes)
-		sum_times+=times
-		sum_memo+=memo
-
-
-		f = open("BFSG.csv", 'a+')
-		f.write("{},BFSG,{},{},{:0.6f},{:0.6f}\n".format(j%40+1, node_created, step, times, memo))
-		print("Results testcase {}. Node generated: {}, Step: {}, Time: {:0.6f} s, Memory: {:0.6f} MB\n".format(j+1, node_created, step, times, memo))
-		f.close()
+	# imap hands results back in level order whatever order the workers finish in
+	with Pool(WORKERS, maxtasksperchild=1) as pool:
+		for j, result in pool.imap(solve_level, range(i, count)):
+			f = open("BFSG.csv", 'a+')
+			if isinstance(result, str):
+				f.write("{},{},,,,\n".format(j+1, ALGORITHM))
+				print("Results testcase {}. {}\n".format(j+1, result))
+				f.close()
+				continue
+			(metrics, missed) = result
+			times = metrics.search_time
+			memo = metrics.peak_mb or 0
+			sum_times+=times
+			sum_memo+=memo
+
+			f.write("{},{},{},{},{:0.6f},{}\n".format(j+1, ALGORITHM, metrics.nodes, metrics.steps, times, "" if metrics.peak_mb is None else "{:0.6f}".format(memo)))
+			write_jsonl("BFSG.jsonl", metrics)
+			print("Results testcase {}{}. Node generated: {}, Step: {}, Time: {:0.6f} s, Memory: {:0.6f} MB\n".format(j+1, " (cached)" if metrics.cached else " (resumed)" if metrics.resumed else "", metrics.nodes, metrics.steps, times, memo))
+			print("Setup: {:0.6f} s, {:0.0f} nodes/s, peak frontier: {}, explored: {}, heuristic: {} calls in {:0.6f} s\n".format(metrics.setup_ns / 1e9, metrics.nodes_per_sec, metrics.peak_frontier, metrics.explored, metrics.heuristic_calls, metrics.heuristic_ns / 1e9))
+			if solver.COUNT_MISSED:
+				print("Duplicates missed by old keys: {}\n".format(missed))
+			if metrics.pruned is not None:
+				print("Children pruned by deadlock rule: {}\n".format(metrics.pruned))
+			if metrics.dropped:
+				print("Frontier entries dropped by the memory budget: {}\n".format(metrics.dropped))
+			f.close()
 
 	print("\nSolving BFS algorithm results Completed")
-	print(sum_times/40,sum_memo/40)
\ No newline at end of file
+	print(sum_times/count,sum_memo/count)
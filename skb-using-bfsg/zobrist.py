@@ -0,0 +1,59 @@
+import random
+from bisect import insort
+
+
+#------------------------
+# Canonical State Keys
+#------------------------
+def canonical(boxes):
+	return tuple(sorted(boxes))
+
+def push_box(boxes, box_from, box_to):
+	"""Moves one box in a canonical (sorted) boxes tuple without a set round-trip."""
+	boxes = list(boxes)
+	boxes.remove(box_from)
+	insort(boxes, box_to)
+	return tuple(boxes)
+
+
+class ZobristTable:
+	"""One random 64-bit word per (cell, box) and (cell, player). The hash of a
+	state is the xor of its words, so a step or a push updates it in O(1)."""
+
+	def __init__(self, cells, seed=0):
+		rng = random.Random(seed)
+		self.box = {cell: rng.getrandbits(64) for cell in cells}
+		self.player = {cell: rng.getrandbits(64) for cell in cells}
+
+	def hash(self, player, boxes):
+		h = self.player[player]
+		for box in boxes:
+			h ^= self.box[box]
+		return h
+
+	def move(self, h, player, new_player, box_to=None):
+		"""Hash after the player steps to new_player, pushing the box there to box_to."""
+		h ^= self.player[player] ^ self.player[new_player]
+		if box_to is not None:
+			h ^= self.box[new_player] ^ self.box[box_to]
+		return h
+
+	def shift_box(self, h, box_from, box_to):
+		return h ^ self.box[box_from] ^ self.box[box_to]
+
+
+class StateKey:
+	"""Explored-set key that reuses the incremental Zobrist hash instead of
+	hashing the whole boxes tuple on every lookup."""
+	__slots__ = ('player', 'boxes', 'hash')
+
+	def __init__(self, player, boxes, h):
+		self.player = player
+		self.boxes = boxes
+		self.hash = h
+
+	def __hash__(self):
+		return self.hash
+
+	def __eq__(self, other):
+		return self.hash == other.hash and self.player == other.player and self.boxes == other.boxes